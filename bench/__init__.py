@@ -0,0 +1,5 @@
+"""
+Benchmarks for yass; run from the repository root, e.g.
+`python -m bench.cells`, `python -m bench.stages` or
+`python -m bench.importtime`.
+"""
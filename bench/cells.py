@@ -0,0 +1,78 @@
+"""
+Benchmark parsing TimeTable cells: datetime.strptime vs yass.parse.
+"""
+
+import sys
+import random
+import datetime
+import argparse
+import timeit
+
+from yass.parse import RAW_CELL_TIME_FORMAT, _parse_cell_time
+
+
+def synthetic_cells(n_rows: int, n_columns: int, seed: int = 0) -> list[str]:
+    """
+    Generate the cells of a large table in RAW_CELL_TIME_FORMAT, with the
+    times of each row increasing from left to right.
+    """
+
+    rng = random.Random(seed)
+    cells = []
+
+    for _ in range(n_rows):
+        minutes = rng.randrange(24 * 60)
+
+        for _ in range(n_columns):
+            minutes = (minutes + rng.randrange(1, 10)) % (24 * 60)
+            hour, minute = divmod(minutes, 60)
+
+            period = "AM" if hour < 12 else "PM"
+            cells.append(f"{hour % 12 or 12}:{minute:02d} {period}")
+
+    return cells
+
+
+def _strptime(cell: str) -> datetime.time:
+    return datetime.datetime.strptime(cell, RAW_CELL_TIME_FORMAT).time()
+
+
+def main() -> None:
+    """
+    Time both parsers over the same synthetic table.
+    """
+
+    parser = argparse.ArgumentParser(prog="python -m bench.cells")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cells = synthetic_cells(args.rows, args.columns)
+
+    if list(map(_strptime, cells)) != list(map(_parse_cell_time, cells)):
+        print("error: parsers disagree", file=sys.stderr)
+        sys.exit(1)
+
+    def run_strptime() -> None:
+        for cell in cells:
+            _strptime(cell)
+
+    def run_parse_cell_time() -> None:
+        # NOTE: a cold memo for every run; repeated cells still hit it
+        _parse_cell_time.cache_clear()
+
+        for cell in cells:
+            _parse_cell_time(cell)
+
+    baseline = min(timeit.repeat(run_strptime, number=1, repeat=args.repeat))
+    fast = min(timeit.repeat(run_parse_cell_time, number=1, repeat=args.repeat))
+
+    print(f"cells:            {len(cells)}")
+    print(f"strptime:         {baseline * 1000:.2f} ms")
+    print(f"_parse_cell_time: {fast * 1000:.2f} ms")
+    print(f"speedup:          {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Check the import time of the yass CLI against a budget, with
+`python -X importtime`; fails when `import yass` is over budget or pulls in
+any of the heavy dependencies that only subcommands need.
+"""
+
+import sys
+import argparse
+import subprocess
+
+HEAVY_MODULES = ("requests", "lxml", "serde")
+
+
+def import_times(statement: str) -> dict[str, int]:
+    """
+    The cumulative import time, in microseconds, of every module imported by
+    running `statement` in a fresh interpreter.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    times = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        (_, cumulative, name) = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def main() -> None:
+    """
+    Measure `import yass`, taking the best of several runs.
+    """
+
+    parser = argparse.ArgumentParser(prog="python -m bench.importtime")
+    parser.add_argument(
+        "--budget",
+        help="most milliseconds `import yass` may take (default: 50)",
+        type=float,
+        default=50.0,
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [import_times("import yass") for _ in range(args.repeat)]
+    best = min(times["yass"] for times in runs) / 1000
+
+    heavy = sorted(
+        name
+        for name in runs[0]
+        if any(
+            name == module or name.startswith(f"{module}.") for module in HEAVY_MODULES
+        )
+    )
+
+    print(f"import yass: {best:.2f} ms (budget: {args.budget:.2f} ms)")
+
+    failed = False
+
+    if best > args.budget:
+        print("error: over budget", file=sys.stderr)
+        failed = True
+
+    if len(heavy) != 0:
+        print(f"error: imports heavy modules: {', '.join(heavy)}", file=sys.stderr)
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+A synthetic RIT Campus Shuttles site, laid out as `yass.scrape.periods` and
+`yass.scrape.timetables` expect, served from memory through a `requests`
+transport adapter.
+"""
+
+from typing import Any
+import random
+import urllib.parse
+import dataclasses
+
+import requests
+import requests.adapters
+
+from yass.const import ROOT_SCHEDULE_URL
+from yass.transport import build_response
+
+SUB_PERIOD_NAMES = ["Weekday", "Weekend", "Friday", "Saturday", "Sunday", "Break"]
+
+
+@dataclasses.dataclass(frozen=True)
+class SiteShape:
+    """
+    The size of a synthetic site; every (period, sub-period) has `routes`
+    routes, each with a TimeTable of `rows` x `columns` cells.
+    """
+
+    periods: int = 2
+    sub_periods: int = 2
+    routes: int = 8
+    rows: int = 60
+    columns: int = 10
+    seed: int = 0
+
+
+def _time(minutes: int) -> str:
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    period = "AM" if hour < 12 else "PM"
+
+    return f"{hour % 12 or 12}:{minute:02d} {period}"
+
+
+def _route_page(shape: SiteShape, rng: random.Random) -> str:
+    n_stops = max(shape.columns * 2, 16)
+    stops = rng.sample([f"Stop {i}" for i in range(n_stops)], shape.columns - 1)
+
+    # NOTE: like the real routes, start and end at the same stop
+    names = [f"{stops[0]} Departure", *stops[1:], f"{stops[0]} Arrival"]
+    th = "".join(f"<th> {name} </th>" for name in names)
+
+    trs = []
+    minutes = 5 * 60 + rng.randrange(60)
+
+    for _ in range(shape.rows):
+        minutes += rng.randrange(10, 30)
+        cell = minutes
+
+        tds = []
+        for _ in range(shape.columns):
+            cell += rng.randrange(1, 8)
+            tds.append(f"<td>{_time(cell)}</td>")
+
+        # NOTE: some trips end early; their rows are short
+        if rng.random() < 0.1:
+            del tds[rng.randrange(1, shape.columns) :]
+
+        trs.append(f"<tr>{''.join(tds)}</tr>")
+
+    return (
+        "<html><head><meta charset='utf-8'><title>Route</title></head><body>"
+        f"<h1>Route</h1><table><thead><tr>{th}</tr></thead>"
+        f"<tbody>{''.join(trs)}</tbody></table></body></html>"
+    )
+
+
+def generate(shape: SiteShape) -> dict[str, bytes]:
+    """
+    Generate the pages of a synthetic site, keyed by URL path.
+    """
+
+    rng = random.Random(shape.seed)
+    pages: dict[str, bytes] = {}
+
+    pair_divs = []
+
+    for p in range(shape.periods):
+        part_divs = []
+
+        for s in range(shape.sub_periods):
+            name = SUB_PERIOD_NAMES[s % len(SUB_PERIOD_NAMES)]
+            part_divs.append(f"<div><h4>{name} Shuttle Schedules and Maps</h4></div>")
+
+            for r in range(shape.routes):
+                code = r % 99 + 1
+                href = f"/parking/routes/{p}-{s}-{r}"
+
+                begins = f"Begins {r % 12 + 1}/{p + 1}/2025" if r % 4 == 1 else " "
+                part_divs.append(
+                    f"<div><div><span><a href='{href}'>{code} Route {r}</a>"
+                    f"<span>{begins}</span></span></div></div>"
+                )
+
+                pages[href] = _route_page(shape, rng).encode("utf-8")
+
+        pair_divs.append(
+            f"<div><div><h3>Period {p} Shuttle Schedule</h3></div>"
+            f"<div>{''.join(part_divs)}</div></div>"
+        )
+
+    root = (
+        "<html><head><meta charset='utf-8'><title>Campus Shuttles</title></head>"
+        f"<body>{''.join(pair_divs)}</body></html>"
+    )
+    pages[urllib.parse.urlparse(ROOT_SCHEDULE_URL).path] = root.encode("utf-8")
+
+    return pages
+
+
+class SiteAdapter(requests.adapters.BaseAdapter):
+    """
+    A transport adapter that serves the pages of a synthetic site.
+    """
+
+    pages: dict[str, bytes]
+
+    def __init__(self, pages: dict[str, bytes]) -> None:
+        super().__init__()
+        self.pages = pages
+
+    def send(  # type: ignore[override] # pylint: disable=arguments-differ
+        self, request: requests.PreparedRequest, **_: Any
+    ) -> requests.Response:
+        path = urllib.parse.urlparse(request.url).path
+        body = self.pages.get(str(path))
+
+        if body is None:
+            return build_response(request, 404, {}, b"", "Not Found")
+
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        return build_response(request, 200, headers, body, "OK")
+
+    def close(self) -> None:
+        pass
+
+
+def session(pages: dict[str, bytes]) -> requests.Session:
+    """
+    A Session that serves the pages of a synthetic site for every https URL.
+    """
+
+    site_session = requests.Session()
+    site_session.mount("https://", SiteAdapter(pages))
+
+    return site_session
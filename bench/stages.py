@@ -0,0 +1,351 @@
+"""
+Benchmark the stages of a scrape on a synthetic site (or on responses
+recorded with `yass scrape --record`), each on its own:
+
+- fetch: fetching every page
+- html_parse: parsing every (fetched) page into an element tree
+- scrape_periods: extracting Periods, SubPeriods and Routes from the root
+  page's tree
+- scrape_time_tables: extracting the TimeTable of every route page's tree
+  (with `--stream-tables`, of its bytes, as extracting is then parsing)
+- parse_ast: building the AST from the scraped data
+- serialize: encoding the AST as JSON
+- scrape_ast: fetching, scraping and parsing together, pipelined as `yass
+  scrape` does
+
+Every stage but scrape_ast runs on the inputs of the one before, prepared
+once beforehand, so it times no other stage. Pages are served from memory,
+so no stage waits on the network.
+
+Memory is the peak of what Python allocates (per `tracemalloc`); lxml's own
+allocations, e.g. for element trees, aren't counted.
+
+Results can be saved as a baseline and later compared against:
+
+```sh
+python -m bench.stages --save baseline.json
+python -m bench.stages --compare baseline.json
+```
+"""
+
+from typing import Any, Callable
+import io
+import sys
+import json
+import logging
+import argparse
+import timeit
+import tracemalloc
+import urllib.parse
+import dataclasses
+
+import lxml.html
+import requests
+
+from yass.const import ROOT_SCHEDULE_URL
+from yass.encode import write_json
+from yass.parse import parse_ast, _parse_cell_time
+from yass.pipeline import scrape_ast
+from yass.transport import ReplayAdapter
+from yass.types import ScrapeContext
+from yass.scrape.fetch import Page, fetch, parse_page
+from yass.scrape.periods import PeriodsScrape, extract_periods, scrape_periods
+from yass.scrape.timetables import extract_time_table, scrape_time_tables
+from yass.scrape.types import ScrapedTimeTables
+
+from bench.site import SiteShape, generate, session as site_session
+
+STAGES = (
+    "fetch",
+    "html_parse",
+    "scrape_periods",
+    "scrape_time_tables",
+    "parse_ast",
+    "serialize",
+    "scrape_ast",
+)
+
+
+@dataclasses.dataclass
+class StageResult:
+    """
+    The best time of a stage over several runs, the peak memory Python
+    allocates in one run, and how much work a run does (`count` of `unit`).
+    """
+
+    seconds: float
+    peak_bytes: int
+    count: int
+    unit: str
+
+    def throughput(self) -> str:
+        """
+        Work done per second, human-readable.
+        """
+
+        if self.unit == "bytes":
+            return f"{self.count / self.seconds / 1e6:,.1f} MB/s"
+
+        return f"{self.count / self.seconds:,.0f} {self.unit}/s"
+
+
+def _measure(run: Callable[[], Any], repeat: int, count: int, unit: str) -> StageResult:
+    seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+
+    # NOTE: tracing slows everything down; measure memory on a separate run
+    tracemalloc.start()
+    try:
+        (start, _) = tracemalloc.get_traced_memory()
+        result = run()
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+
+    return StageResult(seconds, peak - start, count, unit)
+
+
+@dataclasses.dataclass
+class _Inputs:
+    """
+    The inputs of every stage, prepared once so that no stage times another.
+    """
+
+    periods: PeriodsScrape
+    time_tables: ScrapedTimeTables
+
+    # the root page's, then every route page's
+    urls: list[str]
+    pages: list[Page]
+    trees: list[lxml.html.HtmlElement]
+
+    n_routes: int
+    n_cells: int
+
+
+def _prepare(ctx: ScrapeContext) -> _Inputs:
+    periods = scrape_periods(ctx)
+    time_tables = scrape_time_tables(ctx, periods)
+
+    urls = [ROOT_SCHEDULE_URL] + [
+        urllib.parse.urljoin(ROOT_SCHEDULE_URL, route.href)
+        for part in periods.period_parts
+        for route in part.routes
+    ]
+    urls = list(dict.fromkeys(urls))
+
+    pages = [fetch(ctx, url) for url in urls]
+
+    return _Inputs(
+        periods,
+        time_tables,
+        urls,
+        pages,
+        [parse_page(page) for page in pages],
+        sum(len(part.routes) for part in periods.period_parts),
+        sum(
+            len(row)
+            for group in time_tables
+            for time_table in group.values()
+            for row in time_table.values
+        ),
+    )
+
+
+def run_stages(
+    session: requests.Session,
+    repeat: int,
+    stream_fetch: bool = False,
+    stream_tables: bool = False,
+) -> dict[str, StageResult]:
+    """
+    Time every stage of a scrape through `session`.
+    """
+
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.WARNING)
+
+    ctx = ScrapeContext(
+        logger, session, stream_fetch=stream_fetch, stream_tables=stream_tables
+    )
+
+    inputs = _prepare(ctx)
+    n_bytes = sum(len(page.content) for page in inputs.pages)
+
+    def extract_time_tables() -> Any:
+        route_pages = inputs.pages[1:]
+        if stream_tables:
+            return [extract_time_table(page, None, True) for page in route_pages]
+
+        return [
+            extract_time_table(page, tree)
+            for page, tree in zip(route_pages, inputs.trees[1:])
+        ]
+
+    def cold_parse_ast() -> Any:
+        _parse_cell_time.cache_clear()
+        return parse_ast(inputs.periods, inputs.time_tables)
+
+    ast = cold_parse_ast()
+
+    def serialize() -> str:
+        buf = io.StringIO()
+        write_json(ast, buf)
+        return buf.getvalue()
+
+    return {
+        "fetch": _measure(
+            lambda: [fetch(ctx, url) for url in inputs.urls], repeat, n_bytes, "bytes"
+        ),
+        "html_parse": _measure(
+            lambda: [parse_page(page) for page in inputs.pages],
+            repeat,
+            n_bytes,
+            "bytes",
+        ),
+        "scrape_periods": _measure(
+            lambda: extract_periods(ctx, inputs.trees[0]),
+            repeat,
+            inputs.n_routes,
+            "routes",
+        ),
+        "scrape_time_tables": _measure(
+            extract_time_tables, repeat, inputs.n_cells, "cells"
+        ),
+        "parse_ast": _measure(cold_parse_ast, repeat, inputs.n_cells, "cells"),
+        "serialize": _measure(
+            serialize, repeat, len(serialize().encode("utf-8")), "bytes"
+        ),
+        "scrape_ast": _measure(
+            lambda: scrape_ast(ctx), repeat, inputs.n_cells, "cells"
+        ),
+    }
+
+
+def _report(results: dict[str, StageResult], baseline: dict[str, Any] | None) -> None:
+    print(f"{'stage':<20} {'time':>10} {'throughput':>18} {'python heap':>12}", end="")
+    print(f" {'vs baseline':>12}" if baseline is not None else "")
+
+    for name in STAGES:
+        result = results[name]
+
+        print(
+            f"{name:<20} {result.seconds * 1000:>8.2f}ms {result.throughput():>18} "
+            f"{result.peak_bytes / 1e6:>10.2f}MB",
+            end="",
+        )
+
+        if baseline is not None and name in baseline["stages"]:
+            change = result.seconds / baseline["stages"][name]["seconds"] - 1
+            print(f" {change:>+11.1%}")
+        else:
+            print()
+
+
+def _regressions(
+    results: dict[str, StageResult], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    return [
+        name
+        for name in STAGES
+        if name in baseline["stages"]
+        and results[name].seconds
+        > baseline["stages"][name]["seconds"] * (1 + threshold)
+    ]
+
+
+def main() -> None:
+    """
+    Run the benchmark, optionally saving or comparing against a baseline.
+    """
+
+    parser = argparse.ArgumentParser(prog="python -m bench.stages")
+    parser.add_argument("--periods", type=int, default=SiteShape.periods)
+    parser.add_argument("--sub-periods", type=int, default=SiteShape.sub_periods)
+    parser.add_argument("--routes", type=int, default=SiteShape.routes)
+    parser.add_argument("--rows", type=int, default=SiteShape.rows)
+    parser.add_argument("--columns", type=int, default=SiteShape.columns)
+    parser.add_argument("--seed", type=int, default=SiteShape.seed)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--replay",
+        help="benchmark responses recorded with `yass scrape --record` instead",
+        metavar="DIR",
+        default=None,
+    )
+    parser.add_argument(
+        "--stream-fetch",
+        help="parse pages in chunks as they're read in scrape_ast",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stream-tables",
+        help="extract route tables with a parser target, while parsing",
+        action="store_true",
+    )
+    parser.add_argument("--save", help="save the results as a baseline", default=None)
+    parser.add_argument("--compare", help="compare against a baseline", default=None)
+    parser.add_argument(
+        "--threshold",
+        help="fail a comparison on any stage slower by this fraction (default: 0.1)",
+        type=float,
+        default=0.1,
+    )
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        inputs: dict[str, Any] = {"replay": args.replay}
+
+        session = requests.Session()
+        session.mount("https://", ReplayAdapter(args.replay))
+    else:
+        shape = SiteShape(
+            args.periods,
+            args.sub_periods,
+            args.routes,
+            args.rows,
+            args.columns,
+            args.seed,
+        )
+        inputs = dataclasses.asdict(shape)
+
+        session = site_session(generate(shape))
+
+    results = run_stages(session, args.repeat, args.stream_fetch, args.stream_tables)
+
+    baseline: dict[str, Any] | None = None
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if baseline["inputs"] != inputs:
+            print("warning: baseline was measured on other inputs", file=sys.stderr)
+
+    _report(results, baseline)
+
+    if args.save is not None:
+        saved = {
+            "inputs": inputs,
+            "stages": {
+                name: dataclasses.asdict(result) for name, result in results.items()
+            },
+        }
+
+        with open(args.save, "w", encoding="utf-8") as baseline_file:
+            json.dump(saved, baseline_file, indent=4)
+            baseline_file.write("\n")
+
+    if baseline is not None:
+        regressions = _regressions(results, baseline, args.threshold)
+
+        if len(regressions) != 0:
+            print(
+                f"error: slower than baseline: {', '.join(regressions)}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
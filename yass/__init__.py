@@ -2,29 +2,11 @@
 Yet Another (RIT Bus) Schedule Scraper.
 """
 
-from typing import MutableSequence, TextIO, TypeAlias, Iterable, Literal, Any, cast
-import re
 import sys
-import enum
 import logging
 import argparse
 import datetime
-import itertools
-import dataclasses
-
-import serde.json
-import requests
-import lxml.html
-
-from yass.parse import parse_ast
-from yass.types import ScrapeContext
-from yass.scrape.periods import (
-    PeriodsScrape,
-    ScrapedSubPeriod,
-    ScrapedRoute,
-    scrape_periods,
-)
-from yass.scrape.timetables import ScrapedTimeTable, scrape_time_tables
+import importlib
 
 
 def get_logger(verbose: bool) -> logging.Logger:
@@ -47,40 +29,165 @@ def get_logger(verbose: bool) -> logging.Logger:
     return root
 
 
-def scrape(args: argparse.Namespace) -> None:
+def positive_int(value: str) -> int:
     """
-    scrape subcommand
+    argparse type for integers greater than zero.
     """
-    logger = get_logger(args.verbose)
-    session = requests.Session()
-    ctx = ScrapeContext(logger, session)
 
-    periods = scrape_periods(ctx)
-    time_tables = scrape_time_tables(ctx, periods)
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'") from None
+
+    if parsed < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: '{value}'")
 
-    ast = parse_ast(periods, time_tables)
+    return parsed
 
-    indent = 4 if args.pretty else None
-    serialized = serde.json.to_json(ast, indent=indent)
 
-    outfile: TextIO | None = None
-    if args.output is not None:
-        outfile = open(args.output, "w", encoding="utf-8")
-    else:
-        outfile = sys.stdout
+def when(value: str) -> datetime.datetime:
+    """
+    argparse type for a point in time: an ISO 8601 datetime, or a date for
+    the end of that day; local time unless it has an offset.
+    """
+
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: '{value}'") from None
 
-    outfile.write(serialized)
-    outfile.write("\n")
+    # NOTE: a date alone is as of the end of that day
+    if len(value) == len("YYYY-MM-DD"):
+        parsed = datetime.datetime.combine(parsed.date(), datetime.time.max)
+
+    return parsed
+
+
+def iso_date(value: str) -> datetime.date:
+    """
+    argparse type for an ISO 8601 date.
+    """
 
-    if args.output:
-        outfile.close()
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: '{value}'") from None
 
 
+# NOTE: modules are only imported once their subcommand runs
 COMMANDS = {
-    "scrape": scrape,
+    "scrape": "yass.commands.scrape",
+    "watch": "yass.commands.watch",
+    "serve": "yass.commands.serve",
+    "history": "yass.commands.history",
+    "export": "yass.commands.export",
 }
 
 
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the options for formatting an output AST.
+    """
+
+    parser.add_argument(
+        "-p", "--pretty", help="pretty print output", action="store_true"
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="output format (default: json)",
+        choices=["json", "binary", "mapped"],
+        default="json",
+    )
+
+
+def add_fetch_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the options for fetching (and reusing) pages.
+    """
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of route pages to fetch concurrently",
+        type=positive_int,
+        default=1,
+    )
+
+    # NOTE: a recording of revalidated pages (304s) can't be replayed without
+    # the cache it was recorded against
+    sources = parser.add_mutually_exclusive_group()
+    sources.add_argument(
+        "--cache", help="cache fetched pages in a directory", default=None
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        help="seconds before a cached page is revalidated (default: 300)",
+        type=float,
+        default=300.0,
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="maximum bytes of cached pages (default: 64 MiB)",
+        type=positive_int,
+        default=64 * 1024 * 1024,
+    )
+    parser.add_argument(
+        "--memo",
+        help="reuse results scraped from unchanged pages, stored in a directory",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--stream-fetch",
+        help="parse pages in chunks as they download",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stream-tables",
+        help="extract route tables while parsing, without building a tree",
+        action="store_true",
+    )
+
+    sources.add_argument(
+        "--record",
+        help="record the responses fetched into a directory",
+        metavar="DIR",
+        default=None,
+    )
+    sources.add_argument(
+        "--replay",
+        help="replay the responses recorded in a directory, without network",
+        metavar="DIR",
+        default=None,
+    )
+
+
+def add_watch_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the options for scraping periodically.
+    """
+
+    parser.add_argument(
+        "--interval",
+        help="seconds between scrapes (default: 300)",
+        type=float,
+        default=300.0,
+    )
+    parser.add_argument(
+        "--jitter",
+        help="randomize intervals by up to this fraction (default: 0.1)",
+        type=float,
+        default=0.1,
+    )
+    parser.add_argument(
+        "--max-backoff",
+        help="most seconds to wait after failed scrapes (default: 3600)",
+        type=float,
+        default=3600.0,
+    )
+
+
 def main() -> None:
     """
     Parse arguments and run Scraper.
@@ -96,8 +203,105 @@ def main() -> None:
         "scrape", help="scrape rit bus schedule and output an ast"
     )
     scrape_parser.add_argument("-o", "--output", help="output file", default=None)
+    add_output_arguments(scrape_parser)
+    add_fetch_arguments(scrape_parser)
     scrape_parser.add_argument(
-        "-p", "--pretty", help="pretty print output", action="store_true"
+        "--since",
+        help="output a (json) patch against a previously scraped ast instead",
+        default=None,
+    )
+    scrape_parser.add_argument(
+        "--stats",
+        help="print timings and counters of the scrape as json to stderr",
+        action="store_true",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="re-scrape periodically, rewriting the ast when it changes"
+    )
+    watch_parser.add_argument("-o", "--output", help="output file", required=True)
+    add_output_arguments(watch_parser)
+    add_fetch_arguments(watch_parser)
+    add_watch_arguments(watch_parser)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="serve an ast (and slices of it) over http"
+    )
+    serve_parser.add_argument(
+        "ast",
+        help="serve this ast file, reloaded when it changes (default: scrape it)",
+        nargs="?",
+        default=None,
+    )
+    serve_parser.add_argument(
+        "--host", help="address to listen on (default: 127.0.0.1)", default="127.0.0.1"
+    )
+    serve_parser.add_argument(
+        "--port", help="port to listen on (default: 8000)", type=int, default=8000
+    )
+    add_fetch_arguments(serve_parser)
+    add_watch_arguments(serve_parser)
+
+    history_parser = subparsers.add_parser(
+        "history", help="keep a history of asts, and look back through it"
+    )
+    history_parser.add_argument(
+        "database", help="history database (created if it doesn't exist)"
+    )
+    actions = history_parser.add_subparsers(dest="action", required=True)
+
+    add_parser = actions.add_parser("add", help="add an ast file to the history")
+    add_parser.add_argument("ast", help="ast file, in any output format")
+    add_parser.add_argument(
+        "--at", help="when the ast is as of (default: now)", type=when, default=None
+    )
+
+    actions.add_parser("log", help="list the snapshots in the history")
+
+    show_parser = actions.add_parser("show", help="output the ast as of a date")
+    show_parser.add_argument(
+        "when", help="date or datetime (default: latest)", type=when, nargs="?"
+    )
+    show_parser.add_argument("-o", "--output", help="output file", default=None)
+    add_output_arguments(show_parser)
+
+    changes_parser = actions.add_parser(
+        "changes", help="list the routes whose timetables changed between dates"
+    )
+    changes_parser.add_argument("since", help="date or datetime", type=when)
+    changes_parser.add_argument(
+        "until", help="date or datetime (default: now)", type=when, nargs="?"
+    )
+
+    export_parser = subparsers.add_parser(
+        "export", help="export an ast in another format"
+    )
+    export_parser.add_argument("ast", help="ast file, in any output format")
+    export_parser.add_argument(
+        "--gtfs",
+        help=(
+            "write a gtfs feed to a directory (or a .zip file); stop_lat and "
+            "stop_lon are left empty, and must be filled in for a valid feed"
+        ),
+        metavar="PATH",
+        required=True,
+    )
+    export_parser.add_argument(
+        "--start",
+        help="first date of the feed (default: today)",
+        type=iso_date,
+        default=None,
+    )
+    export_parser.add_argument(
+        "--end",
+        help="last date of the feed (default: a year after the first)",
+        type=iso_date,
+        default=None,
+    )
+    export_parser.add_argument(
+        "--period",
+        help="the period to export (required when the ast has several)",
+        default=None,
     )
 
     args = parser.parse_args()
@@ -106,4 +310,5 @@ def main() -> None:
         print(f"error: unrecognized command: {args.command}", file=sys.stderr)
         sys.exit(1)
 
-    COMMANDS[args.command](args)
+    command = importlib.import_module(COMMANDS[args.command])
+    command.run(args)
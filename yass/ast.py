@@ -4,8 +4,9 @@ An AST.
 
 # pylint: disable=too-few-public-methods
 
-from typing import TypeAlias, NewType, Literal
+from typing import Any, TypeAlias, NewType, Literal
 import enum
+import json
 import datetime
 import serde
 
@@ -42,6 +43,9 @@ class TimeTable:
 
 TimeTableIdx = NewType("TimeTableIdx", int)
 
+# a column of a TimeTable
+TimeTablePosition: TypeAlias = tuple[TimeTableIdx, int]
+
 
 @serde.serde
 class SubPeriod:
@@ -99,3 +103,91 @@ class Ast:
 
     period_to_sub_periods: dict[PeriodIdx, list[SubPeriodIdx]]
     sub_period_routes: dict[SubPeriodIdx, list[RouteIdx]]
+
+    # NOTE: reverse indexes; not serialized, derived from the maps above when
+    # not given (e.g. when loading an AST)
+    stop_routes: dict[StopIdx, list[RouteIdx]] = serde.field(
+        default_factory=dict, skip=True
+    )
+    stop_columns: dict[StopIdx, list[TimeTablePosition]] = serde.field(
+        default_factory=dict, skip=True
+    )
+    route_sub_period: dict[RouteIdx, SubPeriodIdx] = serde.field(
+        default_factory=dict, skip=True
+    )
+    route_period: dict[RouteIdx, PeriodIdx] = serde.field(
+        default_factory=dict, skip=True
+    )
+
+    def __post_init__(self) -> None:
+        if not any(getattr(self, name) for name in REVERSE_INDEX_FIELDS):
+            self.reindex()
+
+    def reindex(self) -> None:
+        """
+        Rebuild the reverse indexes from the index maps.
+        """
+
+        self.stop_routes = {}
+        self.stop_columns = {}
+        self.route_sub_period = {}
+        self.route_period = {}
+
+        # NOTE: Routes may share a TimeTable; index its columns once
+        indexed: set[TimeTableIdx] = set()
+
+        for route_idx, time_table_idx in self.route_time_table.items():
+            columns = self.time_tables[time_table_idx].columns
+
+            for j, (stop_idx, _) in enumerate(columns):
+                if time_table_idx not in indexed:
+                    self.stop_columns.setdefault(stop_idx, []).append(
+                        (time_table_idx, j)
+                    )
+
+                stop_routes = self.stop_routes.setdefault(stop_idx, [])
+                if route_idx not in stop_routes:
+                    stop_routes.append(route_idx)
+
+            indexed.add(time_table_idx)
+
+        for period_idx, sub_period_idxs in self.period_to_sub_periods.items():
+            for sub_period_idx in sub_period_idxs:
+                for route_idx in self.sub_period_routes.get(sub_period_idx, []):
+                    self.route_sub_period[route_idx] = sub_period_idx
+                    self.route_period[route_idx] = period_idx
+
+
+INDEX_MAP_FIELDS = (
+    "route_stops",
+    "route_time_table",
+    "period_to_sub_periods",
+    "sub_period_routes",
+)
+
+REVERSE_INDEX_FIELDS = (
+    "stop_routes",
+    "stop_columns",
+    "route_sub_period",
+    "route_period",
+)
+
+
+def from_dict(raw: dict[str, Any]) -> Ast:
+    """
+    Load an AST from its decoded JSON (e.g. `json.loads` of its JSON).
+    """
+
+    # NOTE: JSON object keys are always strings; the index maps are int-keyed
+    for name in INDEX_MAP_FIELDS:
+        raw[name] = {int(key): value for key, value in raw[name].items()}
+
+    return serde.from_dict(Ast, raw)
+
+
+def from_json(s: str | bytes) -> Ast:
+    """
+    Load an AST serialized as JSON.
+    """
+
+    return from_dict(json.loads(s))
@@ -0,0 +1,341 @@
+"""
+Compact Binary Encoding of an AST.
+
+All integers are little-endian. Strings are a `u32` byte length followed by
+UTF-8; arrays are a `u32` item count followed by the packed items:
+
+```text
+magic       b"YASB"
+version     u16
+routes      codes: i32[], names: str[], begins: i32[] (date ordinals; 0 = None)
+stops       str[]
+time_tables u32 count, then per table:
+                n_columns: u32, n_rows: u32
+                stops: i32[n_columns], parts: i8[n_columns]
+                cells: i16[n_columns * n_rows] (column by column, minutes
+                       since midnight; -1 = empty)
+periods     names: str[]
+sub_periods names: str[]
+route_stops             keys: i32[], offsets: i32[], values: i32[]
+route_time_table        keys: i32[], values: i32[]
+period_to_sub_periods   keys: i32[], offsets: i32[], values: i32[]
+sub_period_routes       keys: i32[], offsets: i32[], values: i32[]
+```
+
+Maps of lists are stored as a key array plus a flattened value array split by
+an offsets array (offsets has one more entry than keys).
+"""
+
+from typing import BinaryIO, Sequence
+import sys
+import array
+import struct
+import datetime
+
+from yass.ast import (
+    Ast,
+    Route,
+    Period,
+    SubPeriod,
+    StopIdx,
+    StopPart,
+    TimeTable,
+    TimeTableColumn,
+)
+from yass.columnar import ColumnarTimeTable
+
+MAGIC = b"YASB"
+VERSION = 1
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+_NO_DATE = 0
+
+
+def _to_little_endian(items: array.array) -> bytes:
+    if sys.byteorder == "big":
+        items = array.array(items.typecode, items)
+        items.byteswap()
+
+    return items.tobytes()
+
+
+class _Writer:
+    """
+    Appends encoded values to a list of byte strings.
+    """
+
+    parts: list[bytes]
+
+    def __init__(self) -> None:
+        self.parts = []
+
+    def u32(self, value: int) -> None:
+        """
+        Write an unsigned 32-bit int.
+        """
+
+        self.parts.append(_U32.pack(value))
+
+    def array(self, typecode: str, values: Sequence[int]) -> None:
+        """
+        Write a counted array of ints.
+        """
+
+        self.u32(len(values))
+        self.parts.append(_to_little_endian(array.array(typecode, values)))
+
+    def strings(self, values: Sequence[str]) -> None:
+        """
+        Write a counted array of strings.
+        """
+
+        self.u32(len(values))
+
+        for value in values:
+            encoded = value.encode("utf-8")
+            self.u32(len(encoded))
+            self.parts.append(encoded)
+
+    def index_map(self, index_map: dict[int, int]) -> None:
+        """
+        Write a map of ints to ints.
+        """
+
+        self.array("i", list(index_map.keys()))
+        self.array("i", list(index_map.values()))
+
+    def index_list_map(self, index_map: dict[int, list[int]]) -> None:
+        """
+        Write a map of ints to lists of ints.
+        """
+
+        offsets = [0]
+        values: list[int] = []
+
+        for value in index_map.values():
+            values.extend(value)
+            offsets.append(len(values))
+
+        self.array("i", list(index_map.keys()))
+        self.array("i", offsets)
+        self.array("i", values)
+
+
+class _Reader:
+    """
+    Decodes values from a buffer, front to back.
+    """
+
+    data: memoryview
+    offset: int
+
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def _take(self, size: int) -> memoryview:
+        if self.offset + size > len(self.data):
+            raise ValueError("truncated yass binary data")
+
+        view = self.data[self.offset : self.offset + size]
+        self.offset += size
+
+        return view
+
+    def u16(self) -> int:
+        """
+        Read an unsigned 16-bit int.
+        """
+
+        (value,) = _U16.unpack(self._take(_U16.size))
+        return int(value)
+
+    def u32(self) -> int:
+        """
+        Read an unsigned 32-bit int.
+        """
+
+        (value,) = _U32.unpack(self._take(_U32.size))
+        return int(value)
+
+    def array(self, typecode: str, count: int | None = None) -> array.array:
+        """
+        Read an array of ints; counted unless `count` is given.
+        """
+
+        if count is None:
+            count = self.u32()
+
+        items = array.array(typecode)
+        items.frombytes(self._take(count * items.itemsize))
+
+        if sys.byteorder == "big":
+            items.byteswap()
+
+        return items
+
+    def strings(self) -> list[str]:
+        """
+        Read a counted array of strings.
+        """
+
+        return [str(self._take(self.u32()), "utf-8") for _ in range(self.u32())]
+
+    def index_map(self) -> dict[int, int]:
+        """
+        Read a map of ints to ints.
+        """
+
+        keys = self.array("i")
+        values = self.array("i")
+
+        return dict(zip(keys, values))
+
+    def index_list_map(self) -> dict[int, list[int]]:
+        """
+        Read a map of ints to lists of ints.
+        """
+
+        keys = self.array("i")
+        offsets = self.array("i")
+        values = self.array("i")
+
+        return {
+            key: values[offsets[i] : offsets[i + 1]].tolist()
+            for i, key in enumerate(keys)
+        }
+
+
+def _write_time_table(writer: _Writer, time_table: TimeTable) -> None:
+    columnar = ColumnarTimeTable.from_time_table(time_table)
+
+    writer.u32(len(columnar.columns))
+    writer.u32(columnar.n_rows)
+
+    writer.parts.append(
+        _to_little_endian(array.array("i", (stop for stop, _ in columnar.columns)))
+    )
+    writer.parts.append(
+        _to_little_endian(
+            array.array("b", (part.value for _, part in columnar.columns))
+        )
+    )
+
+    for cells in columnar.cells:
+        writer.parts.append(_to_little_endian(cells))
+
+
+def _read_time_table(reader: _Reader) -> TimeTable:
+    n_columns = reader.u32()
+    n_rows = reader.u32()
+
+    stops = reader.array("i", n_columns)
+    parts = reader.array("b", n_columns)
+
+    columns: list[TimeTableColumn] = [
+        (StopIdx(stop), StopPart(part)) for stop, part in zip(stops, parts)
+    ]
+    cells = [reader.array("h", n_rows) for _ in range(n_columns)]
+
+    return ColumnarTimeTable(columns, cells, n_rows).to_time_table()
+
+
+def dumps(ast: Ast) -> bytes:
+    """
+    Encode an AST.
+    """
+
+    writer = _Writer()
+    writer.parts.append(MAGIC)
+    writer.parts.append(_U16.pack(VERSION))
+
+    writer.array("i", [route.code for route in ast.routes])
+    writer.strings([route.name for route in ast.routes])
+    writer.array(
+        "i",
+        [
+            route.begins.toordinal() if route.begins is not None else _NO_DATE
+            for route in ast.routes
+        ],
+    )
+
+    writer.strings(ast.stops)
+
+    writer.u32(len(ast.time_tables))
+    for time_table in ast.time_tables:
+        _write_time_table(writer, time_table)
+
+    writer.strings([period.name for period in ast.periods])
+    writer.strings([sub_period.name for sub_period in ast.sub_periods])
+
+    writer.index_list_map(ast.route_stops)  # type: ignore[arg-type]
+    writer.index_map(ast.route_time_table)  # type: ignore[arg-type]
+    writer.index_list_map(ast.period_to_sub_periods)  # type: ignore[arg-type]
+    writer.index_list_map(ast.sub_period_routes)  # type: ignore[arg-type]
+
+    return b"".join(writer.parts)
+
+
+def dump(ast: Ast, fp: BinaryIO) -> None:
+    """
+    Encode an AST into a (binary) file object.
+    """
+
+    fp.write(dumps(ast))
+
+
+def loads(data: bytes) -> Ast:
+    """
+    Decode an AST.
+    """
+
+    if not data.startswith(MAGIC):
+        raise ValueError("not yass binary data (bad magic)")
+
+    reader = _Reader(data)
+    reader.offset = len(MAGIC)
+
+    version = reader.u16()
+    if version != VERSION:
+        raise ValueError(f"unsupported yass binary version {version}")
+
+    codes = reader.array("i")
+    names = reader.strings()
+    begins = reader.array("i")
+
+    routes = [
+        Route(
+            code,
+            name,
+            datetime.date.fromordinal(ordinal) if ordinal != _NO_DATE else None,
+        )
+        for code, name, ordinal in zip(codes, names, begins)
+    ]
+
+    stops = reader.strings()
+    time_tables = [_read_time_table(reader) for _ in range(reader.u32())]
+
+    periods = [Period(name) for name in reader.strings()]
+    sub_periods = [SubPeriod(name) for name in reader.strings()]
+
+    return Ast(
+        routes=routes,
+        stops=stops,
+        time_tables=time_tables,
+        periods=periods,
+        sub_periods=sub_periods,
+        route_stops=reader.index_list_map(),  # type: ignore[arg-type]
+        route_time_table=reader.index_map(),  # type: ignore[arg-type]
+        period_to_sub_periods=reader.index_list_map(),  # type: ignore[arg-type]
+        sub_period_routes=reader.index_list_map(),  # type: ignore[arg-type]
+    )
+
+
+def load(fp: BinaryIO) -> Ast:
+    """
+    Decode an AST from a (binary) file object.
+    """
+
+    return loads(fp.read())
@@ -0,0 +1,243 @@
+"""
+Persistent On-Disk HTTP Cache.
+
+Bodies are stored content-addressed (by the SHA-256 of the body) and are
+referenced from per-URL entries:
+
+```text
+CACHE_DIR/
+    entries/<sha256 of url>.json
+    blobs/<sha256 of body>
+```
+
+Entries remember the validators (`ETag` and `Last-Modified`) sent with a body
+so that stale entries can be revalidated with a conditional request.
+"""
+
+from typing import Any
+import os
+import json
+import contextlib
+import time
+import hashlib
+import threading
+import dataclasses
+
+from yass.fs import write_atomic
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheEntry:
+    """
+    A cached response for a URL.
+    """
+
+    url: str
+    digest: str
+    encoding: str | None
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+
+def content_digest(data: bytes) -> str:
+    """
+    The content address of some data.
+    """
+
+    return hashlib.sha256(data).hexdigest()
+
+
+class HttpCache:
+    """
+    A content-addressed on-disk store of HTTP response bodies keyed by URL.
+
+    Entries younger than `ttl` seconds are fresh and are used without any
+    request; older entries are revalidated. Once the stored bodies exceed
+    `max_size` bytes, the least recently used entries are evicted.
+    """
+
+    path: str
+    ttl: float
+    max_size: int | None
+
+    _lock: threading.Lock
+
+    # bytes of stored bodies, as of the last count; None until first counted
+    _size: int | None
+
+    def __init__(self, path: str, ttl: float, max_size: int | None = None) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._size = None
+
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._blobs_dir, exist_ok=True)
+
+    @property
+    def _entries_dir(self) -> str:
+        return os.path.join(self.path, "entries")
+
+    @property
+    def _blobs_dir(self) -> str:
+        return os.path.join(self.path, "blobs")
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self._entries_dir, f"{content_digest(url.encode())}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blobs_dir, digest)
+
+    def _write_entry(self, entry: CacheEntry) -> None:
+        data = json.dumps(dataclasses.asdict(entry)).encode()
+        write_atomic(self._entry_path(entry.url), data)
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        """
+        Find the entry of a URL; None if the URL (or its body) is not cached.
+        """
+
+        try:
+            with open(self._entry_path(url), "rb") as entry_file:
+                raw: dict[str, Any] = json.load(entry_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        entry = CacheEntry(**raw)
+        if entry.url != url or not os.path.exists(self._blob_path(entry.digest)):
+            return None
+
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        Check if an entry may be used without revalidating it.
+        """
+
+        return time.time() - entry.stored_at < self.ttl
+
+    def revalidation_headers(self, entry: CacheEntry) -> dict[str, str]:
+        """
+        Get the headers of a conditional request for a (stale) entry.
+        """
+
+        headers = {}
+
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        return headers
+
+    def read(self, entry: CacheEntry) -> bytes | None:
+        """
+        Read the body of an entry; None if it was evicted since the lookup.
+        """
+
+        path = self._blob_path(entry.digest)
+
+        try:
+            with open(path, "rb") as blob_file:
+                content = blob_file.read()
+
+            # NOTE: the access time is used to pick eviction candidates
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return content
+
+    def refresh(self, entry: CacheEntry) -> CacheEntry:
+        """
+        Mark an entry as fresh again (e.g. after a 304 Not Modified).
+        """
+
+        refreshed = dataclasses.replace(entry, stored_at=time.time())
+        self._write_entry(refreshed)
+
+        return refreshed
+
+    def store(  # pylint: disable=too-many-arguments
+        self,
+        url: str,
+        content: bytes,
+        *,
+        encoding: str | None,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> CacheEntry:
+        """
+        Store the body of a URL and its validators.
+        """
+
+        digest = content_digest(content)
+
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            write_atomic(blob_path, content)
+
+            with self._lock:
+                if self._size is not None:
+                    self._size += len(content)
+        else:
+            os.utime(blob_path)
+
+        entry = CacheEntry(url, digest, encoding, etag, last_modified, time.time())
+        self._write_entry(entry)
+
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+        return entry
+
+    def evict(self, max_size: int) -> None:
+        """
+        Evict the least recently used entries until the stored bodies take at
+        most `max_size` bytes; the store is only scanned once a running count
+        of their size says it's needed.
+        """
+
+        with self._lock:
+            if self._size is not None and self._size <= max_size:
+                return
+
+            blobs: dict[str, os.stat_result] = {}
+            for name in os.listdir(self._blobs_dir):
+                if not name.startswith(".tmp-"):
+                    with contextlib.suppress(FileNotFoundError):
+                        blobs[name] = os.stat(self._blob_path(name))
+
+            total = sum(stat.st_size for stat in blobs.values())
+            self._size = total
+
+            if total <= max_size:
+                return
+
+            referrers: dict[str, list[str]] = {}
+            for name in os.listdir(self._entries_dir):
+                entry_path = os.path.join(self._entries_dir, name)
+                try:
+                    with open(entry_path, "rb") as entry_file:
+                        digest = json.load(entry_file)["digest"]
+                except (FileNotFoundError, ValueError, KeyError):
+                    continue
+                referrers.setdefault(digest, []).append(entry_path)
+
+            by_last_use = sorted(blobs.items(), key=lambda item: item[1].st_mtime)
+
+            for digest, stat in by_last_use:
+                if total <= max_size:
+                    break
+
+                with contextlib.suppress(FileNotFoundError):
+                    for entry_path in referrers.get(digest, []):
+                        os.unlink(entry_path)
+                    os.unlink(self._blob_path(digest))
+
+                total -= stat.st_size
+
+            self._size = total
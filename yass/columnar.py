@@ -0,0 +1,131 @@
+"""
+Columnar, integer-encoded TimeTables.
+
+Cells are stored as minutes since midnight in one `array('h')` per column,
+with `EMPTY_CELL` standing in for empty cells; a table of `n` cells takes
+about `2 * n` bytes rather than a `datetime.time` object per cell.
+"""
+
+from typing import Iterator, Sequence
+import array
+import datetime
+
+from yass.ast import TimeTable, TimeTableCell, TimeTableColumn
+
+EMPTY_CELL = -1
+
+MINUTES_PER_DAY = 24 * 60
+
+# NOTE: shared instances; decoding never allocates a datetime.time
+_MINUTE_TIMES = tuple(
+    datetime.time(minutes // 60, minutes % 60) for minutes in range(MINUTES_PER_DAY)
+)
+
+
+def cell_to_minutes(cell: TimeTableCell) -> int:
+    """
+    Encode a TimeTable cell as minutes since midnight (or EMPTY_CELL).
+    """
+
+    if cell == "":
+        return EMPTY_CELL
+
+    if cell.second != 0 or cell.microsecond != 0 or cell.tzinfo is not None:
+        raise ValueError(f"time {cell} can't be encoded in whole minutes")
+
+    return cell.hour * 60 + cell.minute
+
+
+def minutes_to_cell(minutes: int) -> TimeTableCell:
+    """
+    Decode minutes since midnight (or EMPTY_CELL) into a TimeTable cell.
+    """
+
+    if minutes == EMPTY_CELL:
+        return ""
+
+    return _MINUTE_TIMES[minutes]
+
+
+class ColumnarTimeTable:
+    """
+    A TimeTable stored column by column as minutes since midnight.
+    """
+
+    __slots__ = ("columns", "cells", "n_rows")
+
+    columns: tuple[TimeTableColumn, ...]
+    cells: tuple[array.array, ...]
+    n_rows: int
+
+    def __init__(
+        self,
+        columns: Sequence[TimeTableColumn],
+        cells: Sequence[array.array],
+        n_rows: int,
+    ) -> None:
+        if len(columns) != len(cells):
+            raise ValueError(f"{len(columns)} columns but {len(cells)} cell arrays")
+        if any(len(column_cells) != n_rows for column_cells in cells):
+            raise ValueError(f"every column must have {n_rows} cells")
+
+        self.columns = tuple(columns)
+        self.cells = tuple(cells)
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_time_table(cls, time_table: TimeTable) -> "ColumnarTimeTable":
+        """
+        Encode a TimeTable; every row must have a cell for every column.
+        """
+
+        n_columns = len(time_table.columns)
+
+        for i, row in enumerate(time_table.rows):
+            if len(row) != n_columns:
+                raise ValueError(
+                    f"row {i} has {len(row)} cells; expected {n_columns} cells"
+                )
+
+        cells = tuple(
+            array.array("h", (cell_to_minutes(row[j]) for row in time_table.rows))
+            for j in range(n_columns)
+        )
+
+        return cls(time_table.columns, cells, len(time_table.rows))
+
+    def to_time_table(self) -> TimeTable:
+        """
+        Decode back into a TimeTable.
+        """
+
+        rows = [list(map(minutes_to_cell, row)) for row in self.iter_rows()]
+        return TimeTable(list(self.columns), rows)
+
+    def iter_rows(self) -> Iterator[tuple[int, ...]]:
+        """
+        Iterate over the rows of (encoded) cells.
+        """
+
+        if len(self.cells) == 0:
+            return iter(() for _ in range(self.n_rows))
+
+        return zip(*self.cells)
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ColumnarTimeTable):
+            return NotImplemented
+
+        return (
+            self.columns == other.columns
+            and self.n_rows == other.n_rows
+            and self.cells == other.cells
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"ColumnarTimeTable(columns={list(self.columns)!r}, n_rows={self.n_rows})"
+        )
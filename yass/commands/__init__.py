@@ -0,0 +1,4 @@
+"""
+Subcommands of the yass CLI; each is only imported when it runs, along with
+its (heavier) dependencies.
+"""
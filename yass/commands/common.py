@@ -0,0 +1,121 @@
+"""
+Helpers shared by subcommands.
+"""
+
+from typing import TextIO
+import sys
+import logging
+import argparse
+import contextlib
+
+import requests
+import requests.adapters
+
+import yass.ast
+import yass.binary
+import yass.mapped
+from yass.ast import Ast
+from yass.cache import HttpCache
+from yass.encode import write_json
+from yass.fs import open_atomic, write_atomic
+from yass.memo import MemoStore
+from yass.stats import Stats
+from yass.transport import RecordingAdapter, ReplayAdapter
+from yass.types import ScrapeContext
+
+
+def load_ast(path: str) -> Ast:
+    """
+    Load an AST from a file in any of the output formats.
+    """
+
+    with open(path, "rb") as ast_file:
+        data = ast_file.read()
+
+    if data.startswith(yass.mapped.MAGIC):
+        with yass.mapped.MappedAst(path) as mapped:
+            return mapped.to_ast()
+
+    if data.startswith(yass.binary.MAGIC):
+        return yass.binary.loads(data)
+
+    return yass.ast.from_json(data)
+
+
+def get_session(args: argparse.Namespace) -> requests.Session:
+    """
+    Setup and return a Session, recording or replaying responses if asked to.
+    """
+
+    session = requests.Session()
+
+    # NOTE: keep a pooled connection around for every concurrent worker
+    pool_maxsize = max(args.jobs, requests.adapters.DEFAULT_POOLSIZE)
+
+    adapter: requests.adapters.BaseAdapter
+    if args.replay is not None:
+        adapter = ReplayAdapter(args.replay)
+    elif args.record is not None:
+        adapter = RecordingAdapter(args.record, pool_maxsize=pool_maxsize)
+    else:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize)
+
+    session.mount("https://", adapter)
+
+    return session
+
+
+def get_context(
+    args: argparse.Namespace, logger: logging.Logger, stats: Stats | None = None
+) -> ScrapeContext:
+    """
+    Setup and return a ScrapeContext from the fetch options.
+    """
+
+    session = get_session(args)
+
+    cache = None
+    if args.cache is not None:
+        cache = HttpCache(args.cache, args.cache_ttl, args.cache_size)
+
+    memo = MemoStore(args.memo) if args.memo is not None else None
+
+    return ScrapeContext(
+        logger,
+        session,
+        workers=args.jobs,
+        cache=cache,
+        memo=memo,
+        stream_fetch=args.stream_fetch,
+        stream_tables=args.stream_tables,
+        stats=stats,
+    )
+
+
+def output(
+    args: argparse.Namespace, ast: Ast, patch: str | None, indent: int | None
+) -> None:
+    """
+    Write the AST (or a patch) to the output file, in the output format.
+    """
+
+    if args.format != "json" and patch is None:
+        dumps = yass.binary.dumps if args.format == "binary" else yass.mapped.dumps
+
+        if args.output is not None:
+            write_atomic(args.output, dumps(ast))
+        else:
+            sys.stdout.buffer.write(dumps(ast))
+        return
+
+    with contextlib.ExitStack() as stack:
+        outfile: TextIO = sys.stdout
+        if args.output is not None:
+            outfile = stack.enter_context(open_atomic(args.output))
+
+        if patch is not None:
+            outfile.write(patch)
+        else:
+            write_json(ast, outfile, indent=indent)
+
+        outfile.write("\n")
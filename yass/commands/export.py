@@ -0,0 +1,33 @@
+"""
+Export an AST in another format.
+"""
+
+import sys
+import argparse
+import datetime
+
+from yass.gtfs import check_period, write_gtfs
+from yass.commands.common import load_ast
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    export subcommand
+    """
+
+    start = args.start or datetime.date.today()
+    end = args.end or start + datetime.timedelta(days=365)
+
+    if end < start:
+        print("error: --end is before --start", file=sys.stderr)
+        sys.exit(1)
+
+    ast = load_ast(args.ast)
+
+    try:
+        check_period(ast, args.period)
+    except ValueError as e:
+        print(f"error: --period: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    write_gtfs(ast, args.gtfs, start, end, args.period)
@@ -0,0 +1,45 @@
+"""
+Keep a history of ASTs, and look back through it.
+"""
+
+import sys
+import argparse
+import datetime
+import contextlib
+
+from yass.history import History
+from yass.commands.common import load_ast, output
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    history subcommand
+    """
+
+    now = datetime.datetime.now().astimezone()
+
+    with contextlib.closing(History(args.database)) as history:
+        if args.action == "add":
+            snapshot = history.add(load_ast(args.ast), args.at or now)
+            print(f"{snapshot.id}\t{snapshot.taken_at.isoformat()}\t{snapshot.digest}")
+
+        elif args.action == "log":
+            for snapshot in history.snapshots():
+                print(
+                    f"{snapshot.id}\t{snapshot.taken_at.isoformat()}\t{snapshot.digest}"
+                )
+
+        elif args.action == "show":
+            found = history.as_of(args.when or now)
+            if found is None:
+                print("error: no snapshot as of then", file=sys.stderr)
+                sys.exit(1)
+
+            output(args, history.load(found), None, 4 if args.pretty else None)
+
+        elif args.action == "changes":
+            for change in history.changed_time_tables(args.since, args.until or now):
+                print(
+                    f"{change.status}\t{change.period}\t{change.sub_period}\t"
+                    f"{change.route}"
+                )
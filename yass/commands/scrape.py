@@ -0,0 +1,40 @@
+"""
+Scrape the schedule once and output an AST.
+"""
+
+import sys
+import json
+import argparse
+
+from yass import get_logger
+from yass.diff import diff, patch_to_json
+from yass.stats import Stats, stage
+from yass.pipeline import scrape_ast
+from yass.commands.common import get_context, load_ast, output
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    scrape subcommand
+    """
+    logger = get_logger(args.verbose)
+
+    stats = Stats() if args.stats else None
+    ctx = get_context(args, logger, stats)
+
+    ast = scrape_ast(ctx)
+
+    indent = 4 if args.pretty else None
+
+    patch: str | None = None
+    if args.since is not None:
+        with stage(stats, "diff"):
+            base = load_ast(args.since)
+            patch = patch_to_json(diff(base, ast), indent=indent)
+
+    with stage(stats, "serialize"):
+        output(args, ast, patch, indent)
+
+    if stats is not None:
+        json.dump(stats.summary(), sys.stderr, indent=4)
+        sys.stderr.write("\n")
@@ -0,0 +1,41 @@
+"""
+Serve an AST over HTTP.
+"""
+
+import argparse
+import threading
+
+from yass import get_logger
+from yass.serve import AstServer
+from yass.watch import Watcher
+from yass.commands.common import get_context, load_ast
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    serve subcommand
+    """
+    logger = get_logger(args.verbose)
+
+    if args.ast is not None:
+        server = AstServer((args.host, args.port), logger, args.ast, load_ast)
+    else:
+        server = AstServer((args.host, args.port), logger)
+
+        watcher = Watcher(
+            get_context(args, logger),
+            args.interval,
+            jitter=args.jitter,
+            max_backoff=args.max_backoff,
+            on_change=server.update,
+        )
+        threading.Thread(target=watcher.run, daemon=True).start()
+
+    logger.info("serving on http://%s:%d", args.host, args.port)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,43 @@
+"""
+Re-scrape the schedule periodically, rewriting the AST when it changes.
+"""
+
+import argparse
+
+from yass import get_logger
+from yass.ast import Ast
+from yass.watch import Watcher
+from yass.commands.common import get_context, load_ast, output
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    watch subcommand
+    """
+    logger = get_logger(args.verbose)
+    ctx = get_context(args, logger)
+
+    indent = 4 if args.pretty else None
+
+    # NOTE: an unchanged schedule shouldn't rewrite the output on restart
+    last: Ast | None = None
+    try:
+        last = load_ast(args.output)
+    except FileNotFoundError:
+        pass
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.warning("ignoring unreadable output %s", args.output, exc_info=True)
+
+    watcher = Watcher(
+        ctx,
+        args.interval,
+        jitter=args.jitter,
+        max_backoff=args.max_backoff,
+        on_change=lambda ast: output(args, ast, None, indent),
+        ast=last,
+    )
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
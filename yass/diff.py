@@ -0,0 +1,206 @@
+"""
+Entity-by-entity differences between two ASTs.
+
+A patch only carries the entities that changed:
+
+```json
+{
+    "base": "<sha256 of the base AST>",
+    "lists": {"time_tables": {"length": 16, "changed": {"3": {...}}}},
+    "maps": {"route_time_table": {"changed": {"16": 3}, "removed": [2]}}
+}
+```
+
+Lists (e.g. `time_tables`) are patched by index, maps (e.g.
+`route_time_table`) by key; fields without changes are left out.
+"""
+
+from typing import Any, get_args, get_type_hints
+import json
+import hashlib
+import dataclasses
+
+import serde
+import serde.json
+
+from yass.ast import Ast, INDEX_MAP_FIELDS
+
+LIST_FIELDS = ("routes", "stops", "time_tables", "periods", "sub_periods")
+
+
+@dataclasses.dataclass
+class ListPatch:
+    """
+    Changes to a list of entities; the list is truncated or extended to
+    `length` and then `changed` entities are replaced.
+    """
+
+    length: int
+    changed: dict[int, Any]
+
+
+@dataclasses.dataclass
+class MapPatch:
+    """
+    Changes to an index map.
+    """
+
+    changed: dict[int, Any]
+    removed: list[int]
+
+
+@dataclasses.dataclass
+class AstPatch:
+    """
+    Changes that turn a base AST (identified by its digest) into another.
+    """
+
+    base: str
+    lists: dict[str, ListPatch]
+    maps: dict[str, MapPatch]
+
+
+def ast_digest(ast: Ast) -> str:
+    """
+    A digest identifying the content of an AST.
+    """
+
+    return hashlib.sha256(serde.json.to_json(ast).encode()).hexdigest()
+
+
+def _diff_list(base: list[Any], new: list[Any]) -> ListPatch | None:
+    changed = {}
+
+    for i, entity in enumerate(new):
+        if i >= len(base) or base[i] != entity:
+            changed[i] = entity
+
+    if len(changed) == 0 and len(base) == len(new):
+        return None
+
+    return ListPatch(len(new), changed)
+
+
+def _diff_map(base: dict[int, Any], new: dict[int, Any]) -> MapPatch | None:
+    changed = {key: value for key, value in new.items() if base.get(key) != value}
+    removed = [key for key in base if key not in new]
+
+    if len(changed) == 0 and len(removed) == 0:
+        return None
+
+    return MapPatch(changed, removed)
+
+
+def diff(base: Ast, new: Ast) -> AstPatch:
+    """
+    Find the changes that turn `base` into `new`.
+    """
+
+    lists = {}
+    for name in LIST_FIELDS:
+        list_patch = _diff_list(getattr(base, name), getattr(new, name))
+        if list_patch is not None:
+            lists[name] = list_patch
+
+    maps = {}
+    for name in INDEX_MAP_FIELDS:
+        map_patch = _diff_map(getattr(base, name), getattr(new, name))
+        if map_patch is not None:
+            maps[name] = map_patch
+
+    return AstPatch(ast_digest(base), lists, maps)
+
+
+def apply(base: Ast, patch: AstPatch) -> Ast:
+    """
+    Rebuild an AST from its base and a patch; `base` is left unmodified.
+    """
+
+    if ast_digest(base) != patch.base:
+        raise ValueError("patch does not apply to this ast (base digest mismatch)")
+
+    fields: dict[str, Any] = {}
+
+    for name in LIST_FIELDS:
+        entities = list(getattr(base, name))
+
+        list_patch = patch.lists.get(name)
+        if list_patch is not None:
+            del entities[list_patch.length :]
+            entities.extend([None] * (list_patch.length - len(entities)))
+
+            for i, entity in list_patch.changed.items():
+                entities[i] = entity
+
+        fields[name] = entities
+
+    for name in INDEX_MAP_FIELDS:
+        index_map = dict(getattr(base, name))
+
+        map_patch = patch.maps.get(name)
+        if map_patch is not None:
+            for key in map_patch.removed:
+                del index_map[key]
+            index_map.update(map_patch.changed)
+
+        fields[name] = index_map
+
+    return Ast(**fields)
+
+
+def patch_to_json(patch: AstPatch, indent: int | None = None) -> str:
+    """
+    Serialize a patch as JSON.
+    """
+
+    raw = {
+        "base": patch.base,
+        "lists": {
+            name: {
+                "length": list_patch.length,
+                "changed": serde.to_dict(list_patch.changed, reuse_instances=False),
+            }
+            for name, list_patch in patch.lists.items()
+        },
+        "maps": {
+            name: {
+                "changed": serde.to_dict(map_patch.changed, reuse_instances=False),
+                "removed": map_patch.removed,
+            }
+            for name, map_patch in patch.maps.items()
+        },
+    }
+
+    # NOTE: encoded as the AST is, so a patch reads like the output it replaces
+    return serde.json.to_json(raw, indent=indent)
+
+
+def patch_from_json(s: str | bytes) -> AstPatch:
+    """
+    Load a patch serialized as JSON.
+    """
+
+    raw = json.loads(s)
+    hints = get_type_hints(Ast)
+
+    lists = {}
+    for name, raw_list_patch in raw["lists"].items():
+        (entity_type,) = get_args(hints[name])
+
+        changed = {
+            int(i): serde.from_dict(entity_type, entity)
+            for i, entity in raw_list_patch["changed"].items()
+        }
+        lists[name] = ListPatch(raw_list_patch["length"], changed)
+
+    maps = {}
+    for name, raw_map_patch in raw["maps"].items():
+        (_, value_type) = get_args(hints[name])
+
+        changed = {
+            int(key): serde.from_dict(value_type, value)
+            for key, value in raw_map_patch["changed"].items()
+        }
+        maps[name] = MapPatch(changed, list(raw_map_patch["removed"]))
+
+    return AstPatch(raw["base"], lists, maps)
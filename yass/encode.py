@@ -0,0 +1,162 @@
+"""
+Streaming JSON encoding of an AST.
+
+The output is byte-identical to `serde.json.to_json(ast, indent=indent)`, but
+is written to a file object in bounded chunks as it is produced (TimeTables
+row by row) instead of being built as a single string.
+"""
+
+from typing import Any, Callable, Iterable, Iterator, Mapping, TextIO
+import json
+import datetime
+
+import serde
+
+from yass.ast import Ast, TimeTable, TimeTableRow, TimeTableColumn
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _json_column(column: TimeTableColumn) -> list[int]:
+    (stop_idx, stop_part) = column
+    return [stop_idx, stop_part.value]
+
+
+def _json_row(row: TimeTableRow) -> list[str]:
+    return [cell.isoformat() if isinstance(cell, datetime.time) else "" for cell in row]
+
+
+class _Encoder:
+    """
+    Encodes nested JSON values piece by piece, matching the separators and
+    indentation of serde's JSON serializer.
+    """
+
+    _leaf: json.JSONEncoder
+    _indent: str | None
+
+    def __init__(self, indent: int | None) -> None:
+        # NOTE: mirrors the options serde.json passes to json.dumps
+        self._leaf = json.JSONEncoder(
+            ensure_ascii=False, separators=(",", ":"), indent=indent
+        )
+        self._indent = " " * indent if indent is not None else None
+
+    def _newline(self, level: int) -> str:
+        if self._indent is None:
+            return ""
+
+        return "\n" + self._indent * level
+
+    def leaf(self, value: Any, level: int) -> str:
+        """
+        Encode a (small) JSON-compatible value nested `level` deep.
+        """
+
+        encoded = self._leaf.encode(value)
+
+        if self._indent is None or level == 0:
+            return encoded
+
+        # NOTE: newlines inside of strings are escaped; these are all indents
+        return encoded.replace("\n", self._newline(level))
+
+    def sequence(
+        self, items: Iterable[Callable[[int], Iterator[str]]], level: int
+    ) -> Iterator[str]:
+        """
+        Encode a JSON array whose items are produced by `items`.
+        """
+
+        empty = True
+
+        for item in items:
+            yield ("[" if empty else ",") + self._newline(level + 1)
+            yield from item(level + 1)
+            empty = False
+
+        yield "[]" if empty else self._newline(level) + "]"
+
+    def mapping(
+        self, items: Iterable[tuple[str, Callable[[int], Iterator[str]]]], level: int
+    ) -> Iterator[str]:
+        """
+        Encode a JSON object whose values are produced by `items`.
+        """
+
+        empty = True
+
+        for key, item in items:
+            yield ("{" if empty else ",") + self._newline(level + 1)
+            yield self._leaf.encode(key) + ":"
+            yield from item(level + 1)
+            empty = False
+
+        yield "{}" if empty else self._newline(level) + "}"
+
+
+def _iter_ast(encoder: _Encoder, ast: Ast) -> Iterator[str]:
+    def leaf(value: Any) -> Callable[[int], Iterator[str]]:
+        return lambda level: iter((encoder.leaf(value, level),))
+
+    def entities(values: Iterable[Any]) -> Callable[[int], Iterator[str]]:
+        return lambda level: encoder.sequence(
+            (leaf(serde.to_dict(value, reuse_instances=False)) for value in values),
+            level,
+        )
+
+    def index_map(values: Mapping[Any, Any]) -> Callable[[int], Iterator[str]]:
+        return lambda level: encoder.mapping(
+            ((str(key), leaf(value)) for key, value in values.items()), level
+        )
+
+    def time_table(value: TimeTable) -> Callable[[int], Iterator[str]]:
+        columns = (leaf(_json_column(column)) for column in value.columns)
+        rows = (leaf(_json_row(row)) for row in value.rows)
+
+        return lambda level: encoder.mapping(
+            (
+                ("columns", lambda level: encoder.sequence(columns, level)),
+                ("rows", lambda level: encoder.sequence(rows, level)),
+            ),
+            level,
+        )
+
+    fields: list[tuple[str, Callable[[int], Iterator[str]]]] = [
+        ("routes", entities(ast.routes)),
+        ("stops", entities(ast.stops)),
+        (
+            "time_tables",
+            lambda level: encoder.sequence(map(time_table, ast.time_tables), level),
+        ),
+        ("periods", entities(ast.periods)),
+        ("sub_periods", entities(ast.sub_periods)),
+        ("route_stops", index_map(ast.route_stops)),
+        ("route_time_table", index_map(ast.route_time_table)),
+        ("period_to_sub_periods", index_map(ast.period_to_sub_periods)),
+        ("sub_period_routes", index_map(ast.sub_period_routes)),
+    ]
+
+    return encoder.mapping(fields, 0)
+
+
+def write_json(ast: Ast, fp: TextIO, indent: int | None = None) -> None:
+    """
+    Write an AST as JSON to a file object, in chunks of about CHUNK_SIZE.
+    """
+
+    encoder = _Encoder(indent)
+
+    chunk: list[str] = []
+    chunk_len = 0
+
+    for piece in _iter_ast(encoder, ast):
+        chunk.append(piece)
+        chunk_len += len(piece)
+
+        if chunk_len >= CHUNK_SIZE:
+            fp.write("".join(chunk))
+            chunk.clear()
+            chunk_len = 0
+
+    fp.write("".join(chunk))
@@ -0,0 +1,84 @@
+"""
+Filesystem helpers.
+"""
+
+from typing import IO, Any, BinaryIO, ContextManager, Iterator, TextIO, cast
+import os
+import stat
+import functools
+import tempfile
+import contextlib
+
+
+@functools.cache
+def _umask() -> int:
+    # NOTE: the umask can only be read by setting it; do so once, as it's
+    # process-wide and other threads may be creating files
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return umask
+
+
+def _target_mode(path: str) -> int:
+    """
+    The mode a file written to `path` should have: that of the file it
+    replaces, or what `open` would have created it with.
+    """
+
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask()
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Write a file such that readers never observe a partial write.
+    """
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            # NOTE: mkstemp creates files only their owner can read
+            os.fchmod(tmp_file.fileno(), _target_mode(path))
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def _open_atomic(path: str, mode: str, encoding: str | None) -> Iterator[IO[Any]]:
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as tmp_file:
+            # NOTE: mkstemp creates files only their owner can read
+            os.fchmod(tmp_file.fileno(), _target_mode(path))
+            yield tmp_file
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def open_atomic(path: str) -> ContextManager[TextIO]:
+    """
+    Open a text file for writing that replaces `path` only once the with
+    statement completes; on error, `path` is left untouched.
+    """
+
+    return cast(ContextManager[TextIO], _open_atomic(path, "w", "utf-8"))
+
+
+def open_atomic_binary(path: str) -> ContextManager[BinaryIO]:
+    """
+    Like `open_atomic`, but for a binary file.
+    """
+
+    return cast(ContextManager[BinaryIO], _open_atomic(path, "wb", None))
@@ -0,0 +1,368 @@
+"""
+Export an AST as a GTFS Feed.
+
+```text
+agency.txt       the shuttle service
+stops.txt        a stop per Stop (without a location)
+routes.txt       a route per Route
+calendar.txt     a service per SubPeriod (and date its Routes begin on)
+trips.txt        a trip per row of each Route's TimeTable
+stop_times.txt   a stop time per Stop a row has a time for
+```
+
+An arrival column followed by a departure column of the same Stop is one
+stop time. Times after midnight are past 24:00:00, as GTFS expects, both
+within a trip and for trips that run after midnight.
+
+A feed covers a single Period, since the AST doesn't say which dates each
+Period runs on.
+
+The schedule doesn't say where Stops are, so their `stop_lat` and `stop_lon`
+are left empty; GTFS requires them, so a feed only validates once they're
+filled in.
+
+Every file's rows are generated as they're written, so the feed is never
+held in memory; a feed can be written straight into a zip file.
+"""
+
+from typing import Iterable, Iterator, NamedTuple, Sequence
+import io
+import os
+import re
+import csv
+import zipfile
+import datetime
+
+from yass.ast import Ast, RouteIdx, StopIdx, StopPart, SubPeriodIdx, TimeTable
+from yass.const import ROOT_SCHEDULE_URL
+from yass.fs import open_atomic, open_atomic_binary
+
+AGENCY_ID = "rit"
+AGENCY_NAME = "RIT Campus Shuttles"
+AGENCY_TIMEZONE = "America/New_York"
+
+# NOTE: the GTFS route_type of buses
+ROUTE_TYPE_BUS = 3
+
+DAY_SECONDS = 24 * 60 * 60
+
+# NOTE: a row starting this much earlier than the last runs after midnight
+OVERNIGHT_SECONDS = 12 * 60 * 60
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+_WORD_RE = re.compile("[a-z]+")
+_DAY_RANGE_RE = re.compile(r"([a-z]+) *- *([a-z]+)")
+
+Rows = Iterable[Sequence[str | int]]
+
+
+class Service(NamedTuple):
+    """
+    The days a SubPeriod's Routes (that begin on the same date) run on.
+    """
+
+    service_id: str
+    days: tuple[bool, ...]
+    start: datetime.date
+    end: datetime.date
+
+
+class StopTime(NamedTuple):
+    """
+    A trip's arrival at and departure from a Stop, in seconds after the
+    midnight of its service day.
+    """
+
+    stop_idx: StopIdx
+    arrival: int
+    departure: int
+
+
+def service_days(name: str) -> tuple[bool, ...]:
+    """
+    The days of the week (Monday first) a SubPeriod named `name` runs on;
+    every day when its name doesn't say.
+    """
+
+    lower = name.lower()
+
+    if "weekday" in lower:
+        return (True,) * 5 + (False,) * 2
+    if "weekend" in lower:
+        return (False,) * 5 + (True,) * 2
+
+    def day_of(word: str) -> int | None:
+        for i, day in enumerate(DAYS):
+            if len(word) >= 3 and day.startswith(word):
+                return i
+        return None
+
+    days = [False] * 7
+
+    # NOTE: e.g. "Monday-Thursday" (or "Mon - Thu") is every day in between
+    for match in _DAY_RANGE_RE.finditer(lower):
+        (first, last) = (day_of(match[1]), day_of(match[2]))
+        if first is not None and last is not None:
+            for i in range(first, last + 1):
+                days[i] = True
+
+    for word in _WORD_RE.findall(lower):
+        day = day_of(word)
+        if day is not None:
+            days[day] = True
+
+    return tuple(days) if any(days) else (True,) * 7
+
+
+def _date(value: datetime.date) -> str:
+    return value.strftime("%Y%m%d")
+
+
+def _time(seconds: int) -> str:
+    (hours, rest) = divmod(seconds, 60 * 60)
+    (minutes, seconds) = divmod(rest, 60)
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def check_period(ast: Ast, period: str | None) -> None:
+    """
+    Raise ValueError unless `period` names a Period of the AST; it may only be
+    None when there is at most one, since Periods cover different dates the
+    AST doesn't know.
+    """
+
+    names = [ast_period.name for ast_period in ast.periods]
+
+    if period is None and len(names) > 1:
+        raise ValueError(f"pick one of the periods: {', '.join(names)}")
+    if period is not None and period not in names:
+        raise ValueError(f"no period named '{period}'")
+
+
+def services(
+    ast: Ast, start: datetime.date, end: datetime.date, period: str | None = None
+) -> dict[RouteIdx, Service]:
+    """
+    The Service of each Route running between `start` and `end` of the
+    Period named `period` (see `check_period`); a Route beginning after `end`
+    doesn't run at all.
+    """
+
+    check_period(ast, period)
+
+    keyed: dict[tuple[SubPeriodIdx, datetime.date], Service] = {}
+    route_services = {}
+
+    for route_idx, route in enumerate(ast.routes):
+        sub_period_idx = ast.route_sub_period.get(RouteIdx(route_idx))
+        period_idx = ast.route_period.get(RouteIdx(route_idx))
+        if sub_period_idx is None or period_idx is None:
+            continue
+
+        if period is not None and ast.periods[period_idx].name != period:
+            continue
+
+        service_start = max(start, route.begins) if route.begins is not None else start
+        if service_start > end:
+            continue
+
+        # NOTE: Routes that began before `start` run all along
+        key = (sub_period_idx, service_start)
+        if key not in keyed:
+            service_id = str(sub_period_idx)
+            if service_start != start:
+                service_id += f"-{_date(service_start)}"
+
+            keyed[key] = Service(
+                service_id,
+                service_days(ast.sub_periods[sub_period_idx].name),
+                service_start,
+                end,
+            )
+
+        route_services[RouteIdx(route_idx)] = keyed[key]
+
+    return route_services
+
+
+def _row_stop_times(time_table: TimeTable, row_idx: int, offset: int) -> list[StopTime]:
+    stop_times: list[StopTime] = []
+
+    # NOTE: whether the last stop time is an arrival a departure may join
+    arrived = False
+    last = -1
+
+    for (stop_idx, part), cell in zip(time_table.columns, time_table.rows[row_idx]):
+        if not isinstance(cell, datetime.time):
+            continue
+
+        seconds = cell.hour * 60 * 60 + cell.minute * 60 + cell.second + offset
+        if seconds < last:
+            # NOTE: the trip runs past midnight
+            offset += DAY_SECONDS
+            seconds += DAY_SECONDS
+        last = seconds
+
+        if (
+            arrived
+            and part == StopPart.DEPARTURE
+            and stop_times[-1].stop_idx == stop_idx
+        ):
+            stop_times[-1] = stop_times[-1]._replace(departure=seconds)
+            arrived = False
+            continue
+
+        stop_times.append(StopTime(stop_idx, seconds, seconds))
+        arrived = part == StopPart.ARRIVAL
+
+    return stop_times
+
+
+def trips(time_table: TimeTable) -> Iterator[tuple[int, list[StopTime]]]:
+    """
+    The stop times of each row of a TimeTable that makes a trip (stops at
+    least twice), with the row's index.
+    """
+
+    offset = 0
+    first = None
+
+    for row_idx in range(len(time_table.rows)):
+        stop_times = _row_stop_times(time_table, row_idx, offset)
+        if len(stop_times) == 0:
+            continue
+
+        if first is not None and stop_times[0].arrival < first - OVERNIGHT_SECONDS:
+            # NOTE: this (and every later) row runs after midnight
+            offset += DAY_SECONDS
+            stop_times = _row_stop_times(time_table, row_idx, offset)
+
+        first = stop_times[0].arrival
+
+        if len(stop_times) >= 2:
+            yield (row_idx, stop_times)
+
+
+def _trip_id(route_idx: RouteIdx, row_idx: int) -> str:
+    return f"{route_idx}-{row_idx}"
+
+
+def feed(
+    ast: Ast, start: datetime.date, end: datetime.date, period: str | None = None
+) -> Iterator[tuple[str, Rows]]:
+    """
+    The files of a GTFS feed running from `start` to `end`, as (name, rows)
+    pairs whose rows (headers first) are generated as they're consumed.
+    """
+
+    route_services = services(ast, start, end, period)
+
+    yield (
+        "agency.txt",
+        [
+            ("agency_id", "agency_name", "agency_url", "agency_timezone"),
+            (AGENCY_ID, AGENCY_NAME, ROOT_SCHEDULE_URL, AGENCY_TIMEZONE),
+        ],
+    )
+
+    def stops() -> Iterator[Sequence[str | int]]:
+        yield ("stop_id", "stop_name", "stop_lat", "stop_lon")
+        for stop_idx, stop in enumerate(ast.stops):
+            yield (stop_idx, stop, "", "")
+
+    yield ("stops.txt", stops())
+
+    def routes() -> Iterator[Sequence[str | int]]:
+        yield (
+            "route_id",
+            "agency_id",
+            "route_short_name",
+            "route_long_name",
+            "route_type",
+        )
+        for route_idx in route_services:
+            route = ast.routes[route_idx]
+            yield (route_idx, AGENCY_ID, route.code, route.name, ROUTE_TYPE_BUS)
+
+    yield ("routes.txt", routes())
+
+    def calendar() -> Iterator[Sequence[str | int]]:
+        yield ("service_id", *DAYS, "start_date", "end_date")
+        for service in dict.fromkeys(route_services.values()):
+            yield (
+                service.service_id,
+                *(int(day) for day in service.days),
+                _date(service.start),
+                _date(service.end),
+            )
+
+    yield ("calendar.txt", calendar())
+
+    def route_trips() -> Iterator[tuple[RouteIdx, int, list[StopTime]]]:
+        for route_idx in route_services:
+            time_table_idx = ast.route_time_table.get(route_idx)
+            if time_table_idx is None:
+                continue
+
+            for row_idx, stop_times in trips(ast.time_tables[time_table_idx]):
+                yield (route_idx, row_idx, stop_times)
+
+    def trips_rows() -> Iterator[Sequence[str | int]]:
+        yield ("route_id", "service_id", "trip_id")
+        for route_idx, row_idx, _ in route_trips():
+            service_id = route_services[route_idx].service_id
+            yield (route_idx, service_id, _trip_id(route_idx, row_idx))
+
+    yield ("trips.txt", trips_rows())
+
+    def stop_times_rows() -> Iterator[Sequence[str | int]]:
+        yield ("trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence")
+        for route_idx, row_idx, stop_times in route_trips():
+            trip_id = _trip_id(route_idx, row_idx)
+
+            for sequence, stop_time in enumerate(stop_times):
+                yield (
+                    trip_id,
+                    _time(stop_time.arrival),
+                    _time(stop_time.departure),
+                    stop_time.stop_idx,
+                    sequence,
+                )
+
+    yield ("stop_times.txt", stop_times_rows())
+
+
+def write_gtfs(
+    ast: Ast,
+    path: str,
+    start: datetime.date,
+    end: datetime.date,
+    period: str | None = None,
+) -> None:
+    """
+    Write a GTFS feed to a directory, or (when `path` ends with .zip) a zip
+    file written in a single pass; each file replaces the old one only once
+    it's complete.
+    """
+
+    files = feed(ast, start, end, period)
+
+    if path.endswith(".zip"):
+        with (
+            open_atomic_binary(path) as zip_file,
+            zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as feed_zip,
+        ):
+            for name, rows in files:
+                with io.TextIOWrapper(
+                    feed_zip.open(name, "w"), encoding="utf-8", newline=""
+                ) as feed_file:
+                    csv.writer(feed_file, lineterminator="\n").writerows(rows)
+        return
+
+    os.makedirs(path, exist_ok=True)
+
+    for name, rows in files:
+        with open_atomic(os.path.join(path, name)) as feed_file:
+            csv.writer(feed_file, lineterminator="\n").writerows(rows)
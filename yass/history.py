@@ -0,0 +1,290 @@
+"""
+Content-Addressed History of ASTs.
+
+Every snapshot of an AST is split into blobs, keyed by the SHA-256 of their
+(canonical JSON) content: one per TimeTable, one per other field (e.g.
+`routes`) and a manifest naming the rest. Snapshots share every blob that
+didn't change, so the store grows with the changes rather than the number
+of snapshots:
+
+```text
+blobs       digest -> zlib-compressed canonical JSON
+snapshots   taken_at, digest of the AST, digest of its manifest
+```
+
+The store is a single sqlite database.
+"""
+
+from typing import Any
+import json
+import zlib
+import sqlite3
+import datetime
+import dataclasses
+
+import serde
+
+import yass.ast
+from yass.ast import Ast
+from yass.cache import content_digest
+from yass.diff import ast_digest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    manifest TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS snapshots_taken_at ON snapshots (taken_at, id);
+"""
+
+# the fields of the AST needed to tell which Route a TimeTable belongs to
+_ROUTE_FIELDS = (
+    "routes",
+    "periods",
+    "sub_periods",
+    "period_to_sub_periods",
+    "sub_period_routes",
+    "route_time_table",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """
+    An AST added to a History, as of `taken_at`.
+    """
+
+    id: int
+    taken_at: datetime.datetime
+
+    # see `yass.diff.ast_digest`
+    digest: str
+
+    # content address of the manifest blob
+    manifest: str
+
+
+@dataclasses.dataclass(frozen=True)
+class TimeTableChange:
+    """
+    A Route whose TimeTable was added, removed or changed between snapshots;
+    the digests are of its TimeTable before and after.
+    """
+
+    status: str
+    period: str
+    sub_period: str
+    route: str
+
+    before: str | None
+    after: str | None
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _timestamp(when: datetime.datetime) -> str:
+    # NOTE: fixed-width and in UTC, so that timestamps compare as strings
+    return when.astimezone(datetime.timezone.utc).isoformat(timespec="microseconds")
+
+
+def _snapshot(row: tuple[Any, ...]) -> Snapshot:
+    (snapshot_id, taken_at, digest, manifest) = row
+    return Snapshot(
+        snapshot_id, datetime.datetime.fromisoformat(taken_at), digest, manifest
+    )
+
+
+class History:
+    """
+    A store of AST snapshots ordered by when they were taken; naive datetimes
+    are in local time.
+    """
+
+    path: str
+
+    _db: sqlite3.Connection
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+
+        self._db.close()
+
+    def _put(self, value: Any) -> str:
+        data = _encode(value)
+        digest = content_digest(data)
+
+        # NOTE: only compress blobs that aren't already stored
+        row = self._db.execute(
+            "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+
+        if row is None:
+            self._db.execute(
+                "INSERT INTO blobs (digest, data) VALUES (?, ?)",
+                (digest, zlib.compress(data)),
+            )
+
+        return digest
+
+    def _get(self, digest: str) -> Any:
+        row = self._db.execute(
+            "SELECT data FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+
+        if row is None:
+            raise KeyError(f"missing blob {digest}")
+
+        return json.loads(zlib.decompress(row[0]))
+
+    def add(self, ast: Ast, taken_at: datetime.datetime) -> Snapshot:
+        """
+        Add a snapshot of an AST, as of `taken_at`.
+        """
+
+        raw = serde.to_dict(ast, reuse_instances=False)
+
+        digest = ast_digest(ast)
+        timestamp = _timestamp(taken_at)
+
+        with self._db:
+            manifest = {
+                "time_tables": [
+                    self._put(time_table) for time_table in raw.pop("time_tables")
+                ],
+                "fields": {name: self._put(value) for name, value in raw.items()},
+            }
+            manifest_digest = self._put(manifest)
+
+            cursor = self._db.execute(
+                "INSERT INTO snapshots (taken_at, digest, manifest) VALUES (?, ?, ?)",
+                (timestamp, digest, manifest_digest),
+            )
+
+        assert cursor.lastrowid is not None
+        return _snapshot((cursor.lastrowid, timestamp, digest, manifest_digest))
+
+    def snapshots(self) -> list[Snapshot]:
+        """
+        Every snapshot, oldest first.
+        """
+
+        rows = self._db.execute(
+            "SELECT id, taken_at, digest, manifest FROM snapshots "
+            "ORDER BY taken_at, id"
+        )
+
+        return [_snapshot(row) for row in rows]
+
+    def as_of(self, when: datetime.datetime) -> Snapshot | None:
+        """
+        The latest snapshot taken at or before `when`, if any.
+        """
+
+        row = self._db.execute(
+            "SELECT id, taken_at, digest, manifest FROM snapshots "
+            "WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1",
+            (_timestamp(when),),
+        ).fetchone()
+
+        return _snapshot(row) if row is not None else None
+
+    def load(self, snapshot: Snapshot) -> Ast:
+        """
+        Reconstruct the AST of a snapshot.
+        """
+
+        manifest = self._get(snapshot.manifest)
+
+        raw = {name: self._get(digest) for name, digest in manifest["fields"].items()}
+        raw["time_tables"] = [self._get(digest) for digest in manifest["time_tables"]]
+
+        return yass.ast.from_dict(raw)
+
+    def _route_time_tables(self, snapshot: Snapshot) -> dict[tuple[str, str, str], str]:
+        """
+        The digest of each Route's TimeTable, by (period, sub-period, route)
+        name; without loading any TimeTable.
+        """
+
+        manifest = self._get(snapshot.manifest)
+        fields = {name: self._get(manifest["fields"][name]) for name in _ROUTE_FIELDS}
+
+        route_time_tables = {}
+
+        for period_idx, sub_period_idxs in fields["period_to_sub_periods"].items():
+            period = fields["periods"][int(period_idx)]["name"]
+
+            for sub_period_idx in sub_period_idxs:
+                sub_period = fields["sub_periods"][sub_period_idx]["name"]
+
+                for route_idx in fields["sub_period_routes"].get(
+                    str(sub_period_idx), []
+                ):
+                    route = fields["routes"][route_idx]
+                    time_table_idx = fields["route_time_table"].get(str(route_idx))
+                    if time_table_idx is None:
+                        continue
+
+                    key = (period, sub_period, f"{route['code']} {route['name']}")
+                    route_time_tables[key] = manifest["time_tables"][time_table_idx]
+
+        return route_time_tables
+
+    def changed_time_tables(
+        self, since: datetime.datetime, until: datetime.datetime
+    ) -> list[TimeTableChange]:
+        """
+        The Routes whose TimeTables differ between the snapshots as of `since`
+        and as of `until`; Routes are matched by their (and their period's and
+        sub-period's) names.
+        """
+
+        before_snapshot = self.as_of(since)
+        after_snapshot = self.as_of(until)
+
+        before = (
+            self._route_time_tables(before_snapshot)
+            if before_snapshot is not None
+            else {}
+        )
+        after = (
+            self._route_time_tables(after_snapshot)
+            if after_snapshot is not None
+            else {}
+        )
+
+        changes = []
+
+        for key in sorted(before.keys() | after.keys()):
+            (before_digest, after_digest) = (before.get(key), after.get(key))
+            if before_digest == after_digest:
+                continue
+
+            if before_digest is None:
+                status = "added"
+            elif after_digest is None:
+                status = "removed"
+            else:
+                status = "changed"
+
+            changes.append(TimeTableChange(status, *key, before_digest, after_digest))
+
+        return changes
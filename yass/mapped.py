@@ -0,0 +1,564 @@
+"""
+Memory-Mapped Schedule Files.
+
+A fixed-layout, little-endian file that `MappedAst` reads through `mmap`
+without deserializing it; processes mapping the same file share one
+page-cached copy, and opening a file takes constant time.
+
+```text
+header      magic b"YASM", version: u16, padding: u16,
+            counts: u32[5] (stops, routes, time tables, periods, sub-periods),
+            section offsets: u64[6]
+strings     offsets: u32[n_strings + 1], then UTF-8 bytes; stops, then route
+            names, then period names, then sub-period names
+routes      codes: i32[n_routes], begins: i32[n_routes] (date ordinals;
+            0 = None), time tables: i32[n_routes] (-1 = None)
+route_stops         offsets: u32[n_routes + 1], stops: i32[]
+period_sub_periods  offsets: u32[n_periods + 1], sub-periods: i32[]
+sub_period_routes   offsets: u32[n_sub_periods + 1], routes: i32[]
+time_tables index: (n_columns: u32, n_rows: u32, columns: u64, cells: u64)[],
+            then per table columns: (stop: i32, part: i32)[n_columns] and
+            cells: i16[n_columns * n_rows] (column by column, minutes since
+            midnight; -1 = empty)
+```
+
+Every section starts on an 8-byte boundary.
+"""
+
+from typing import Callable, Iterator, Sequence, TypeVar, overload
+import sys
+import mmap
+import array
+import struct
+import datetime
+
+from yass.ast import (
+    Ast,
+    Route,
+    Period,
+    PeriodIdx,
+    RouteIdx,
+    SubPeriod,
+    SubPeriodIdx,
+    StopIdx,
+    StopPart,
+    TimeTable,
+    TimeTableCell,
+    TimeTableColumn,
+    TimeTableIdx,
+)
+from yass.columnar import ColumnarTimeTable, minutes_to_cell
+from yass.fs import write_atomic
+
+MAGIC = b"YASM"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHH5I6Q")
+_TIME_TABLE_ENTRY = struct.Struct("<IIQQ")
+
+_NO_DATE = 0
+_NO_TIME_TABLE = -1
+
+_ALIGNMENT = 8
+
+T = TypeVar("T")
+
+
+def _to_little_endian(items: array.array) -> bytes:
+    if sys.byteorder == "big":
+        items = array.array(items.typecode, items)
+        items.byteswap()
+
+    return items.tobytes()
+
+
+class _Layout:  # pylint: disable=too-few-public-methods
+    """
+    Appends aligned sections to a buffer.
+    """
+
+    buffer: bytearray
+
+    def __init__(self, reserve: int) -> None:
+        self.buffer = bytearray(reserve)
+
+    def section(self, data: bytes) -> int:
+        """
+        Append an aligned section; returns its offset.
+        """
+
+        padding = -len(self.buffer) % _ALIGNMENT
+        self.buffer.extend(bytes(padding))
+
+        offset = len(self.buffer)
+        self.buffer.extend(data)
+
+        return offset
+
+
+def _csr(values: Sequence[Sequence[int]]) -> bytes:
+    offsets = array.array("I", [0])
+    flat = array.array("i")
+
+    for value in values:
+        flat.extend(value)
+        offsets.append(len(flat))
+
+    return _to_little_endian(offsets) + _to_little_endian(flat)
+
+
+def dumps(ast: Ast) -> bytes:  # pylint: disable=too-many-locals
+    """
+    Lay out an AST as a schedule file.
+    """
+
+    layout = _Layout(_HEADER.size)
+
+    strings = [
+        *ast.stops,
+        *(route.name for route in ast.routes),
+        *(period.name for period in ast.periods),
+        *(sub_period.name for sub_period in ast.sub_periods),
+    ]
+    encoded = [string.encode("utf-8") for string in strings]
+
+    string_offsets = array.array("I", [0])
+    for string in encoded:
+        string_offsets.append(string_offsets[-1] + len(string))
+
+    strings_offset = layout.section(
+        _to_little_endian(string_offsets) + b"".join(encoded)
+    )
+
+    n_routes = len(ast.routes)
+
+    routes_offset = layout.section(
+        _to_little_endian(array.array("i", (route.code for route in ast.routes)))
+        + _to_little_endian(
+            array.array(
+                "i",
+                (
+                    route.begins.toordinal() if route.begins is not None else _NO_DATE
+                    for route in ast.routes
+                ),
+            )
+        )
+        + _to_little_endian(
+            array.array(
+                "i",
+                (
+                    ast.route_time_table.get(route_idx, _NO_TIME_TABLE)  # type: ignore
+                    for route_idx in range(n_routes)
+                ),
+            )
+        )
+    )
+
+    route_stops_offset = layout.section(
+        _csr([ast.route_stops.get(i, []) for i in range(n_routes)])  # type: ignore
+    )
+    period_sub_periods_offset = layout.section(
+        _csr(
+            [
+                ast.period_to_sub_periods.get(i, [])  # type: ignore
+                for i in range(len(ast.periods))
+            ]
+        )
+    )
+    sub_period_routes_offset = layout.section(
+        _csr(
+            [
+                ast.sub_period_routes.get(i, [])  # type: ignore
+                for i in range(len(ast.sub_periods))
+            ]
+        )
+    )
+
+    time_tables_offset = layout.section(
+        bytes(_TIME_TABLE_ENTRY.size * len(ast.time_tables))
+    )
+
+    for i, time_table in enumerate(ast.time_tables):
+        columnar = ColumnarTimeTable.from_time_table(time_table)
+
+        columns = array.array("i")
+        for stop, part in columnar.columns:
+            columns.extend((stop, part.value))
+
+        columns_offset = layout.section(_to_little_endian(columns))
+        cells_offset = layout.section(
+            b"".join(_to_little_endian(cells) for cells in columnar.cells)
+        )
+
+        _TIME_TABLE_ENTRY.pack_into(
+            layout.buffer,
+            time_tables_offset + i * _TIME_TABLE_ENTRY.size,
+            len(columnar.columns),
+            columnar.n_rows,
+            columns_offset,
+            cells_offset,
+        )
+
+    _HEADER.pack_into(
+        layout.buffer,
+        0,
+        MAGIC,
+        VERSION,
+        0,
+        len(ast.stops),
+        n_routes,
+        len(ast.time_tables),
+        len(ast.periods),
+        len(ast.sub_periods),
+        strings_offset,
+        routes_offset,
+        route_stops_offset,
+        period_sub_periods_offset,
+        sub_period_routes_offset,
+        time_tables_offset,
+    )
+
+    return bytes(layout.buffer)
+
+
+def write_mapped(ast: Ast, path: str) -> None:
+    """
+    Write an AST as a schedule file; readers never observe a partial file.
+    """
+
+    write_atomic(path, dumps(ast))
+
+
+def _view(data: memoryview, offset: int, typecode: str, count: int) -> Sequence[int]:
+    """
+    A zero-copy view of little-endian ints (a copy on big-endian hosts).
+    """
+
+    size = struct.calcsize(typecode)
+    raw = data[offset : offset + size * count]
+
+    if sys.byteorder == "big":
+        items = array.array(typecode, raw.tobytes())
+        items.byteswap()
+        raw.release()
+        return items
+
+    return raw.cast(typecode)  # type: ignore[call-overload]
+
+
+class _LazySequence(Sequence[T]):
+    """
+    A sequence whose items are decoded on access.
+    """
+
+    def __init__(self, length: int, decode: Callable[[int], T]) -> None:
+        self._length = length
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+
+        return self._decode(index)
+
+
+class MappedTimeTable:
+    """
+    A TimeTable within a schedule file.
+    """
+
+    __slots__ = ("columns", "n_rows", "_cells")
+
+    columns: list[TimeTableColumn]
+    n_rows: int
+    _cells: Sequence[int]
+
+    def __init__(
+        self, columns: list[TimeTableColumn], n_rows: int, cells: Sequence[int]
+    ) -> None:
+        self.columns = columns
+        self.n_rows = n_rows
+        self._cells = cells
+
+    def column(self, j: int) -> Sequence[int]:
+        """
+        A view of the cells of a column as minutes since midnight (-1 for an
+        empty cell).
+        """
+
+        if not 0 <= j < len(self.columns):
+            raise IndexError(j)
+
+        return self._cells[j * self.n_rows : (j + 1) * self.n_rows]
+
+    def cell(self, i: int, j: int) -> TimeTableCell:
+        """
+        Decode the cell at row `i` of column `j`.
+        """
+
+        if not 0 <= i < self.n_rows:
+            raise IndexError(i)
+
+        return minutes_to_cell(self.column(j)[i])
+
+    def iter_rows(self) -> Iterator[list[TimeTableCell]]:
+        """
+        Iterate over the decoded rows.
+        """
+
+        columns = [self.column(j) for j in range(len(self.columns))]
+
+        for i in range(self.n_rows):
+            yield [minutes_to_cell(column[i]) for column in columns]
+
+    def to_time_table(self) -> TimeTable:
+        """
+        Decode the whole TimeTable.
+        """
+
+        return TimeTable(list(self.columns), list(self.iter_rows()))
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+
+class MappedAst:  # pylint: disable=too-many-instance-attributes
+    """
+    A read-only, memory-mapped schedule file with Ast-like accessors; nothing
+    is decoded until it is accessed.
+
+    Views handed out (e.g. `MappedTimeTable.column`) must be released before
+    the file is closed.
+    """
+
+    stops: Sequence[str]
+    routes: Sequence[Route]
+    periods: Sequence[Period]
+    sub_periods: Sequence[SubPeriod]
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as mapped_file:
+            self._mmap = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._map()
+        except ValueError:
+            self.close()
+            raise
+
+    def _map(self) -> None:  # pylint: disable=too-many-locals
+        self._data = memoryview(self._mmap)
+
+        if len(self._data) < _HEADER.size:
+            raise ValueError("not a yass schedule file (too short)")
+
+        (
+            magic,
+            version,
+            _,
+            n_stops,
+            n_routes,
+            n_time_tables,
+            n_periods,
+            n_sub_periods,
+            strings_offset,
+            routes_offset,
+            route_stops_offset,
+            period_sub_periods_offset,
+            sub_period_routes_offset,
+            time_tables_offset,
+        ) = _HEADER.unpack_from(self._data)
+
+        if magic != MAGIC:
+            raise ValueError("not a yass schedule file (bad magic)")
+        if version != VERSION:
+            raise ValueError(f"unsupported yass schedule file version {version}")
+
+        n_strings = n_stops + n_routes + n_periods + n_sub_periods
+        self._string_offsets = _view(self._data, strings_offset, "I", n_strings + 1)
+        self._strings_blob = strings_offset + 4 * (n_strings + 1)
+
+        self._route_codes = _view(self._data, routes_offset, "i", n_routes)
+        self._route_begins = _view(
+            self._data, routes_offset + 4 * n_routes, "i", n_routes
+        )
+        self._route_time_tables = _view(
+            self._data, routes_offset + 8 * n_routes, "i", n_routes
+        )
+
+        self._route_stops = self._csr(route_stops_offset, n_routes)
+        self._period_sub_periods = self._csr(period_sub_periods_offset, n_periods)
+        self._sub_period_routes = self._csr(sub_period_routes_offset, n_sub_periods)
+
+        self._time_tables_offset = time_tables_offset
+        self._n_time_tables = n_time_tables
+
+        self.stops = _LazySequence(n_stops, self._string)
+        self.routes = _LazySequence(n_routes, self._route)
+        self.periods = _LazySequence(
+            n_periods, lambda i: Period(self._string(n_stops + n_routes + i))
+        )
+        self.sub_periods = _LazySequence(
+            n_sub_periods,
+            lambda i: SubPeriod(self._string(n_stops + n_routes + n_periods + i)),
+        )
+
+    def _csr(self, offset: int, count: int) -> tuple[Sequence[int], Sequence[int]]:
+        offsets = _view(self._data, offset, "I", count + 1)
+        values = _view(self._data, offset + 4 * (count + 1), "i", offsets[-1])
+
+        return (offsets, values)
+
+    def _string(self, i: int) -> str:
+        start = self._strings_blob + self._string_offsets[i]
+        end = self._strings_blob + self._string_offsets[i + 1]
+
+        return str(self._data[start:end], "utf-8")
+
+    def _route(self, i: int) -> Route:
+        ordinal = self._route_begins[i]
+        begins = datetime.date.fromordinal(ordinal) if ordinal != _NO_DATE else None
+
+        return Route(self._route_codes[i], self._string(len(self.stops) + i), begins)
+
+    @property
+    def n_time_tables(self) -> int:
+        """
+        The number of TimeTables.
+        """
+
+        return self._n_time_tables
+
+    def time_table(self, idx: int) -> MappedTimeTable:
+        """
+        Get a TimeTable.
+        """
+
+        if not 0 <= idx < self._n_time_tables:
+            raise IndexError(idx)
+
+        (n_columns, n_rows, columns_offset, cells_offset) = (
+            _TIME_TABLE_ENTRY.unpack_from(
+                self._data, self._time_tables_offset + idx * _TIME_TABLE_ENTRY.size
+            )
+        )
+
+        raw_columns = _view(self._data, columns_offset, "i", 2 * n_columns)
+        columns: list[TimeTableColumn] = [
+            (StopIdx(raw_columns[2 * j]), StopPart(raw_columns[2 * j + 1]))
+            for j in range(n_columns)
+        ]
+        cells = _view(self._data, cells_offset, "h", n_columns * n_rows)
+
+        return MappedTimeTable(columns, n_rows, cells)
+
+    def route_time_table(self, route_idx: int) -> TimeTableIdx | None:
+        """
+        Get the TimeTableIdx of a Route, if it has one.
+        """
+
+        idx = self._route_time_tables[route_idx]
+        return TimeTableIdx(idx) if idx != _NO_TIME_TABLE else None
+
+    def route_stops(self, route_idx: int) -> Sequence[int]:
+        """
+        Get the StopIdxs of a Route.
+        """
+
+        (offsets, values) = self._route_stops
+        return values[offsets[route_idx] : offsets[route_idx + 1]]
+
+    def period_sub_periods(self, period_idx: int) -> Sequence[int]:
+        """
+        Get the SubPeriodIdxs of a Period.
+        """
+
+        (offsets, values) = self._period_sub_periods
+        return values[offsets[period_idx] : offsets[period_idx + 1]]
+
+    def sub_period_routes(self, sub_period_idx: int) -> Sequence[int]:
+        """
+        Get the RouteIdxs of a SubPeriod.
+        """
+
+        (offsets, values) = self._sub_period_routes
+        return values[offsets[sub_period_idx] : offsets[sub_period_idx + 1]]
+
+    def to_ast(self) -> Ast:
+        """
+        Decode the whole file into an Ast.
+        """
+
+        n_routes = len(self.routes)
+
+        return Ast(
+            list(self.routes),
+            list(self.stops),
+            [
+                self.time_table(idx).to_time_table()
+                for idx in range(self._n_time_tables)
+            ],
+            list(self.periods),
+            list(self.sub_periods),
+            {
+                RouteIdx(i): [StopIdx(stop) for stop in self.route_stops(i)]
+                for i in range(n_routes)
+            },
+            {
+                RouteIdx(i): time_table_idx
+                for i in range(n_routes)
+                if (time_table_idx := self.route_time_table(i)) is not None
+            },
+            {
+                PeriodIdx(i): [SubPeriodIdx(idx) for idx in self.period_sub_periods(i)]
+                for i in range(len(self.periods))
+            },
+            {
+                SubPeriodIdx(i): [RouteIdx(idx) for idx in self.sub_period_routes(i)]
+                for i in range(len(self.sub_periods))
+            },
+        )
+
+    def close(self) -> None:
+        """
+        Unmap the file; fails, leaving it open, while views of it are held.
+        """
+
+        # NOTE: every view of the file must be released before unmapping it
+        for value in vars(self).values():
+            for view in value if isinstance(value, tuple) else (value,):
+                if isinstance(view, memoryview):
+                    view.release()
+
+        try:
+            self._mmap.close()
+        except BufferError:
+            # NOTE: the file is still mapped; view it again, as before
+            self._map()
+            raise BufferError(
+                "views of a MappedAst must be released before it is closed"
+            ) from None
+
+        for name in list(vars(self)):
+            if name != "_mmap":
+                delattr(self, name)
+
+    def __enter__(self) -> "MappedAst":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
@@ -0,0 +1,55 @@
+"""
+Content-Hash Memoization of scraped and parsed results.
+
+Results are keyed by the digest of the page body they were derived from, so
+an unchanged page is never re-scraped or re-parsed:
+
+```text
+MEMO_DIR/
+    v<MEMO_VERSION>/<namespace>/<digest>.pickle
+```
+"""
+
+from typing import Any
+import os
+import pickle
+
+from yass.fs import write_atomic
+
+# NOTE: bump whenever a memoized result type or the code producing it changes
+MEMO_VERSION = 2
+
+
+class MemoStore:
+    """
+    An on-disk store of pickled results keyed by namespace and digest.
+    """
+
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.join(path, f"v{MEMO_VERSION}")
+
+    def _result_path(self, namespace: str, digest: str) -> str:
+        return os.path.join(self.path, namespace, f"{digest}.pickle")
+
+    def get(self, namespace: str, digest: str) -> Any | None:
+        """
+        Get a memoized result; None if there isn't one.
+        """
+
+        try:
+            with open(self._result_path(namespace, digest), "rb") as result_file:
+                return pickle.load(result_file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, namespace: str, digest: str, result: Any) -> None:
+        """
+        Memoize a result.
+        """
+
+        path = self._result_path(namespace, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        write_atomic(path, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
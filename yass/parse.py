@@ -2,8 +2,12 @@
 Parse scraped data into an AST.
 """
 
+from typing import Callable, Iterable, Iterator, TypeAlias
 import re
 import datetime
+import functools
+import contextlib
+import concurrent.futures
 
 from yass.ast import (
     Ast,
@@ -15,7 +19,9 @@ from yass.ast import (
     StopIdx,
     TimeTable,
     TimeTableIdx,
+    TimeTablePosition,
     TimeTableCell,
+    TimeTableRow,
     SubPeriod,
     SubPeriodIdx,
     StopPart,
@@ -32,6 +38,7 @@ from yass.scrape.types import (
 )
 from yass.scrape.periods import PeriodsScrape
 from yass.scrape.timetables import ScrapedTimeTables
+from yass.memo import MemoStore
 
 
 class AstBuilder:  # pylint: disable=too-many-instance-attributes, R0801
@@ -52,7 +59,14 @@ class AstBuilder:  # pylint: disable=too-many-instance-attributes, R0801
     period_to_sub_periods: dict[PeriodIdx, list[SubPeriodIdx]]
     sub_period_routes: dict[SubPeriodIdx, list[RouteIdx]]
 
+    stop_routes: dict[StopIdx, list[RouteIdx]]
+    stop_columns: dict[StopIdx, list[TimeTablePosition]]
+    route_sub_period: dict[RouteIdx, SubPeriodIdx]
+    route_period: dict[RouteIdx, PeriodIdx]
+
     _stop_to_stop_idx: dict[Stop, StopIdx]
+    # hash of a TimeTable's content -> the TimeTables added with that hash
+    _time_table_hash_to_time_table_idxs: dict[int, list[TimeTableIdx]]
 
     def __init__(self) -> None:
         self.routes = []
@@ -68,7 +82,13 @@ class AstBuilder:  # pylint: disable=too-many-instance-attributes, R0801
         self.period_to_sub_periods = {}
         self.sub_period_routes = {}
 
+        self.stop_routes = {}
+        self.stop_columns = {}
+        self.route_sub_period = {}
+        self.route_period = {}
+
         self._stop_to_stop_idx = {}
+        self._time_table_hash_to_time_table_idxs = {}
 
     def finish(self) -> Ast:
         """
@@ -85,6 +105,10 @@ class AstBuilder:  # pylint: disable=too-many-instance-attributes, R0801
             route_time_table=self.route_time_table,
             period_to_sub_periods=self.period_to_sub_periods,
             sub_period_routes=self.sub_period_routes,
+            stop_routes=self.stop_routes,
+            stop_columns=self.stop_columns,
+            route_sub_period=self.route_sub_period,
+            route_period=self.route_period,
         )
 
     def get_stop_idx(self, stop: Stop) -> StopIdx:
@@ -103,6 +127,52 @@ class AstBuilder:  # pylint: disable=too-many-instance-attributes, R0801
 
         return idx
 
+    def add_time_table(
+        self, route_idx: RouteIdx, time_table: TimeTable
+    ) -> TimeTableIdx:
+        """
+        Add the TimeTable of a Route, indexing the Stops of its columns; a
+        TimeTable identical to one already added is shared rather than added
+        again.
+        """
+
+        # NOTE: only the hash is kept, not a copy of the content; TimeTables
+        # are compared when their hashes match
+        content_hash = hash(
+            (tuple(time_table.columns), tuple(tuple(row) for row in time_table.rows))
+        )
+        same_hash = self._time_table_hash_to_time_table_idxs.setdefault(
+            content_hash, []
+        )
+
+        for time_table_idx in same_hash:
+            if self.time_tables[time_table_idx] == time_table:
+                added = False
+                break
+        else:
+            time_table_idx = TimeTableIdx(len(self.time_tables))
+            self.time_tables.append(time_table)
+
+            same_hash.append(time_table_idx)
+            added = True
+
+        self.route_time_table[route_idx] = time_table_idx
+
+        route_stops = self.route_stops.setdefault(route_idx, [])
+
+        for j, (stop_idx, _) in enumerate(time_table.columns):
+            if added:
+                self.stop_columns.setdefault(stop_idx, []).append((time_table_idx, j))
+
+            if stop_idx not in route_stops:
+                route_stops.append(stop_idx)
+                self.stop_routes.setdefault(stop_idx, []).append(route_idx)
+
+        return time_table_idx
+
+
+# NOTE: TimeTables sent to a worker process at once; amortizes pickling
+PARALLEL_CHUNK_SIZE = 8
 
 RAW_PERIOD_FLUFF_RE = re.compile(" *[Ss]huttle *[Ss]chedule")
 
@@ -181,40 +251,112 @@ def _stop(s_time_table_col: ScrapedTimeTableColumn) -> tuple[Stop, StopPart]:
 
 RAW_CELL_TIME_FORMAT = "%I:%M %p"
 
+# NOTE: accepts exactly what strptime accepts for RAW_CELL_TIME_FORMAT
+RAW_CELL_TIME_RE = re.compile(
+    r"(1[0-2]|0[1-9]|[1-9]):([0-5]\d|\d)\s+(am|pm)", re.IGNORECASE
+)
 
-def _time_table_n_stop(
-    builder: AstBuilder, s_time_table: ScrapedTimeTable
-) -> TimeTable:
-    r_columns = list(map(_stop, s_time_table.columns))
-    columns = []
 
-    for stop, stop_part in r_columns:
-        stop_idx = builder.get_stop_idx(stop)
-        columns.append((stop_idx, stop_part))
+@functools.lru_cache(maxsize=4096)
+def _parse_cell_time(s_time_table_cell: str) -> datetime.time:
+    """
+    Parse a cell in RAW_CELL_TIME_FORMAT; a (much) faster strptime, with the
+    same errors.
+    """
+
+    match = RAW_CELL_TIME_RE.match(s_time_table_cell)
+
+    if match is None:
+        raise ValueError(
+            f"time data {s_time_table_cell!r} does not match format "
+            f"{RAW_CELL_TIME_FORMAT!r}"
+        )
+    if match.end() != len(s_time_table_cell):
+        raise ValueError(f"unconverted data remains: {s_time_table_cell[match.end():]}")
+
+    hour = int(match[1]) % 12
+    if match[3].lower() == "pm":
+        hour += 12
+
+    return datetime.time(hour, int(match[2]))
+
+
+# the Stop (by name) and StopPart of each column, and the rows, of a TimeTable
+_ConvertedTimeTable: TypeAlias = tuple[list[tuple[Stop, StopPart]], list[TimeTableRow]]
+
+
+def _convert_time_table(
+    s_time_table: ScrapedTimeTable, memo: MemoStore | None
+) -> _ConvertedTimeTable:
+    """
+    Convert a TimeTable without an AstBuilder, so that it can be done in
+    another process; its Stops are only given indices when it's added.
+    """
+
+    r_columns = list(map(_stop, s_time_table.columns))
 
     def _time_table_cell(s_time_table_cell: ScrapedTimeTableCell) -> TimeTableCell:
         if s_time_table_cell is None:
             return ""
 
-        date_time = datetime.datetime.strptime(s_time_table_cell, RAW_CELL_TIME_FORMAT)
-        return date_time.time()
+        return _parse_cell_time(s_time_table_cell)
+
+    digest = s_time_table.digest
+
+    if memo is not None and digest is not None:
+        memoized: list[TimeTableRow] | None = memo.get("time_table_rows", digest)
+        if memoized is not None:
+            return (r_columns, memoized)
 
     rows = list(map(lambda row: list(map(_time_table_cell, row)), s_time_table.values))
+
+    if memo is not None and digest is not None:
+        memo.put("time_table_rows", digest, rows)
+
+    return (r_columns, rows)
+
+
+def _time_table_n_stop(
+    builder: AstBuilder, converted: _ConvertedTimeTable
+) -> TimeTable:
+    (r_columns, rows) = converted
+    columns = []
+
+    for stop, stop_part in r_columns:
+        stop_idx = builder.get_stop_idx(stop)
+        columns.append((stop_idx, stop_part))
+
     return TimeTable(columns, rows)
 
 
-def parse_ast(  # pylint: disable=too-many-locals
-    s_periods: PeriodsScrape, s_time_tables: ScrapedTimeTables
-) -> Ast:
+def parsed_routes(s_periods: PeriodsScrape) -> list[ScrapedRoute]:
     """
-    Parse scraped data into a cohesive AST.
+    The Routes whose TimeTables an AST is parsed from, in the order they are
+    parsed; a Route listed under several sub-periods appears once for each.
     """
 
+    s_routes: list[ScrapedRoute] = []
+
+    for s_collect in s_periods.period_parts:
+        for s_sub_period_idx in range(len(s_collect.sub_periods)):
+            s_route_idxs = s_collect.sub_period_to_routes[
+                ScrapedSubPeriodIdx(s_sub_period_idx)
+            ]
+            s_routes.extend(
+                s_collect.routes[s_route_idx] for s_route_idx in s_route_idxs
+            )
+
+    return s_routes
+
+
+def _parse_ast(  # pylint: disable=too-many-locals
+    s_periods: PeriodsScrape,
+    get_s_time_table: Callable[[int, ScrapedRouteIdx], ScrapedTimeTable],
+    convert: Callable[[ScrapedTimeTable], _ConvertedTimeTable],
+) -> Ast:
     builder = AstBuilder()
 
     for s_period_idx, s_period in enumerate(s_periods.periods):
-        s_route_idx_to_s_time_table = s_time_tables[s_period_idx]
-
         period = _period(s_period)
 
         period_idx = PeriodIdx(len(builder.periods))
@@ -245,14 +387,120 @@ def parse_ast(  # pylint: disable=too-many-locals
                 builder.routes.append(route)
 
                 builder.sub_period_routes[sub_period_idx].append(route_idx)
+                builder.route_sub_period[route_idx] = sub_period_idx
+                builder.route_period[route_idx] = period_idx
 
-                s_time_table = s_route_idx_to_s_time_table[s_route_idx]
+                s_time_table = get_s_time_table(s_period_idx, s_route_idx)
 
-                time_table = _time_table_n_stop(builder, s_time_table)
+                time_table = _time_table_n_stop(builder, convert(s_time_table))
+                builder.add_time_table(route_idx, time_table)
 
-                time_table_idx = TimeTableIdx(len(builder.time_tables))
-                builder.time_tables.append(time_table)
+    return builder.finish()
 
-                builder.route_time_table[route_idx] = time_table_idx
 
-    return builder.finish()
+def parse_ast(
+    s_periods: PeriodsScrape,
+    s_time_tables: ScrapedTimeTables,
+    memo: MemoStore | None = None,
+) -> Ast:
+    """
+    Parse scraped data into a cohesive AST; rows parsed from unchanged pages
+    are taken from `memo` when given.
+    """
+
+    return _parse_ast(
+        s_periods,
+        lambda s_period_idx, s_route_idx: s_time_tables[s_period_idx][s_route_idx],
+        lambda s_time_table: _convert_time_table(s_time_table, memo),
+    )
+
+
+def parse_ast_incrementally(
+    s_periods: PeriodsScrape,
+    s_time_tables: Iterable[ScrapedTimeTable],
+    memo: MemoStore | None = None,
+) -> Ast:
+    """
+    Parse scraped data into the same AST as `parse_ast`, taking the TimeTable
+    of each of `parsed_routes(s_periods)`, in order, from `s_time_tables` as it
+    is needed (e.g. while the rest are still being scraped); none is kept once
+    it has been parsed.
+    """
+
+    it = iter(s_time_tables)
+
+    def get_s_time_table(
+        _s_period_idx: int, _s_route_idx: ScrapedRouteIdx
+    ) -> ScrapedTimeTable:
+        try:
+            return next(it)
+        except StopIteration:
+            raise ValueError("fewer TimeTables than parsed Routes") from None
+
+    return _parse_ast(
+        s_periods,
+        get_s_time_table,
+        lambda s_time_table: _convert_time_table(s_time_table, memo),
+    )
+
+
+def parse_ast_parallel(
+    s_periods: PeriodsScrape,
+    s_time_tables: ScrapedTimeTables,
+    memo: MemoStore | None = None,
+    executor: concurrent.futures.Executor | None = None,
+) -> Ast:
+    """
+    Parse scraped data into the same AST as `parse_ast`, converting the
+    TimeTables in worker processes (of `executor`, or of a new pool with a
+    worker per core); their Stops and TimeTables are indexed afterwards, in
+    the order `parse_ast` would have.
+    """
+
+    # NOTE: a TimeTable shared by several Routes is converted once
+    id_to_s_time_table: dict[int, ScrapedTimeTable] = {}
+    for group in s_time_tables:
+        for s_time_table in group.values():
+            id_to_s_time_table.setdefault(id(s_time_table), s_time_table)
+
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(concurrent.futures.ProcessPoolExecutor())
+
+        converted = executor.map(
+            functools.partial(_convert_time_table, memo=memo),
+            id_to_s_time_table.values(),
+            chunksize=PARALLEL_CHUNK_SIZE,
+        )
+        id_to_converted = dict(zip(id_to_s_time_table, converted))
+
+    return _parse_ast(
+        s_periods,
+        lambda s_period_idx, s_route_idx: s_time_tables[s_period_idx][s_route_idx],
+        lambda s_time_table: id_to_converted[id(s_time_table)],
+    )
+
+
+def _parse_snapshot(
+    snapshot: tuple[PeriodsScrape, ScrapedTimeTables], memo: MemoStore | None
+) -> Ast:
+    return parse_ast(*snapshot, memo)
+
+
+def parse_asts(
+    snapshots: Iterable[tuple[PeriodsScrape, ScrapedTimeTables]],
+    memo: MemoStore | None = None,
+    executor: concurrent.futures.Executor | None = None,
+) -> Iterator[Ast]:
+    """
+    Parse many scrapes into ASTs, in order, each in a worker process (of
+    `executor`, or of a new pool with a worker per core).
+    """
+
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(concurrent.futures.ProcessPoolExecutor())
+
+        yield from executor.map(
+            functools.partial(_parse_snapshot, memo=memo), snapshots
+        )
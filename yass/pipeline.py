@@ -0,0 +1,68 @@
+"""
+Scrape and Parse an AST, Pipelined.
+
+Route pages are scraped in background threads while the main thread parses
+the TimeTables already scraped, so that a scrape takes about as long as the
+slower of the two rather than both:
+
+```text
+scrape   [periods][route 1][route 2][route 3]...
+parse                     [route 1][route 2][route 3]...
+```
+
+The AST is the same as from `scrape_time_tables` followed by `parse_ast`.
+
+With stats, the overlapping work is still split into its stages: time spent
+waiting on scraped TimeTables is `scrape_time_tables`, the rest of
+`scrape_parse` is `parse_ast`.
+"""
+
+from typing import Iterator
+import time
+
+from yass.ast import Ast
+from yass.parse import parse_ast_incrementally, parsed_routes
+from yass.stats import stage
+from yass.types import ScrapeContext
+from yass.scrape.periods import scrape_periods
+from yass.scrape.timetables import iter_time_tables
+from yass.scrape.types import ScrapedTimeTable
+
+
+def scrape_ast(ctx: ScrapeContext) -> Ast:
+    """
+    Scrape the schedule and parse it into an AST, parsing each TimeTable as
+    soon as it's scraped.
+    """
+
+    with stage(ctx.stats, "scrape_periods"):
+        periods = scrape_periods(ctx)
+
+    waited = 0.0
+
+    def timed(
+        time_tables: Iterator[ScrapedTimeTable],
+    ) -> Iterator[ScrapedTimeTable]:
+        nonlocal waited
+
+        while True:
+            start = time.perf_counter()
+            time_table = next(time_tables, None)
+            waited += time.perf_counter() - start
+
+            if time_table is None:
+                return
+
+            yield time_table
+
+    start = time.perf_counter()
+
+    with stage(ctx.stats, "scrape_parse"):
+        time_tables = iter_time_tables(ctx, parsed_routes(periods))
+        ast = parse_ast_incrementally(periods, timed(time_tables), ctx.memo)
+
+    if ctx.stats is not None:
+        ctx.stats.stage_done("scrape_time_tables", waited)
+        ctx.stats.stage_done("parse_ast", time.perf_counter() - start - waited)
+
+    return ast
@@ -0,0 +1,200 @@
+"""
+Departure Queries over an AST.
+
+`DepartureIndex` precomputes, for every (Stop, StopPart), the times of every
+non-empty TimeTable cell across all Routes sorted as minutes since midnight;
+lookups bisect these arrays and only allocate for the results they return.
+Times do not wrap around midnight.
+
+Without a StopPart, lookups are of departures: every column but ARRIVAL ones
+(a Stop with a single column has an UNKNOWN part). Arrivals are only returned
+when asked for with `part=StopPart.ARRIVAL`.
+"""
+
+from typing import NamedTuple
+import array
+import bisect
+import datetime
+
+from yass.ast import (
+    Ast,
+    Stop,
+    StopIdx,
+    StopPart,
+    RouteIdx,
+    SubPeriodIdx,
+    TimeTableIdx,
+)
+from yass.columnar import EMPTY_CELL, cell_to_minutes, minutes_to_cell
+
+
+class Departure(NamedTuple):
+    """
+    A time at which a Route serves a Stop; `row` and `column` locate the cell
+    in the Route's TimeTable.
+    """
+
+    time: datetime.time
+    route: RouteIdx
+    time_table: TimeTableIdx
+    row: int
+    column: int
+
+
+_IndexKey = tuple[StopIdx, StopPart | None, SubPeriodIdx | None]
+
+
+class _Departures:  # pylint: disable=too-few-public-methods
+    """
+    Parallel arrays of departures, sorted by time.
+    """
+
+    __slots__ = ("minutes", "routes", "time_tables", "rows", "columns")
+
+    minutes: array.array
+    routes: array.array
+    time_tables: array.array
+    rows: array.array
+    columns: array.array
+
+    def __init__(self, entries: list[tuple[int, int, int, int, int]]) -> None:
+        entries.sort()
+
+        self.minutes = array.array("h", (entry[0] for entry in entries))
+        self.routes = array.array("i", (entry[1] for entry in entries))
+        self.time_tables = array.array("i", (entry[2] for entry in entries))
+        self.rows = array.array("i", (entry[3] for entry in entries))
+        self.columns = array.array("i", (entry[4] for entry in entries))
+
+    def departures(self, start: int, stop: int) -> list[Departure]:
+        """
+        Decode the departures within [start, stop).
+        """
+
+        return [
+            Departure(
+                minutes_to_cell(self.minutes[i]),  # type: ignore[arg-type]
+                RouteIdx(self.routes[i]),
+                TimeTableIdx(self.time_tables[i]),
+                self.rows[i],
+                self.columns[i],
+            )
+            for i in range(start, stop)
+        ]
+
+
+_NO_DEPARTURES = _Departures([])
+
+
+def _minutes(time: datetime.time, round_up: bool) -> int:
+    minutes = time.hour * 60 + time.minute
+
+    if round_up and (time.second != 0 or time.microsecond != 0):
+        minutes += 1
+
+    return minutes
+
+
+class DepartureIndex:
+    """
+    Sorted departures per Stop (and StopPart and SubPeriod) of an AST.
+    """
+
+    _stop_to_stop_idx: dict[Stop, StopIdx]
+    _index: dict[_IndexKey, _Departures]
+
+    def __init__(self, ast: Ast) -> None:  # pylint: disable=too-many-locals
+        self._stop_to_stop_idx = {stop: StopIdx(i) for i, stop in enumerate(ast.stops)}
+
+        route_sub_periods: dict[RouteIdx, list[SubPeriodIdx]] = {}
+        for sub_period_idx, route_idxs in ast.sub_period_routes.items():
+            for route_idx in route_idxs:
+                route_sub_periods.setdefault(route_idx, []).append(sub_period_idx)
+
+        entries: dict[_IndexKey, list[tuple[int, int, int, int, int]]] = {}
+
+        for route_idx, time_table_idx in ast.route_time_table.items():
+            time_table = ast.time_tables[time_table_idx]
+            sub_periods = [None, *route_sub_periods.get(route_idx, [])]
+
+            for j, (stop_idx, stop_part) in enumerate(time_table.columns):
+                # NOTE: None is departures; an arrival is never one
+                parts = (
+                    (stop_part,) if stop_part == StopPart.ARRIVAL else (None, stop_part)
+                )
+                keys = [
+                    (stop_idx, part, sub_period)
+                    for part in parts
+                    for sub_period in sub_periods
+                ]
+                key_entries = [entries.setdefault(key, []) for key in keys]
+
+                for i, row in enumerate(time_table.rows):
+                    if j >= len(row):
+                        continue
+
+                    minutes = cell_to_minutes(row[j])
+                    if minutes == EMPTY_CELL:
+                        continue
+
+                    entry = (minutes, route_idx, time_table_idx, i, j)
+                    for column_entries in key_entries:
+                        column_entries.append(entry)
+
+        self._index = {key: _Departures(value) for key, value in entries.items()}
+
+    def _departures(
+        self,
+        stop: StopIdx | Stop,
+        part: StopPart | None,
+        sub_period: SubPeriodIdx | None,
+    ) -> _Departures:
+        if isinstance(stop, str):
+            if stop not in self._stop_to_stop_idx:
+                raise KeyError(f"unknown stop: '{stop}'")
+            stop = self._stop_to_stop_idx[stop]
+
+        return self._index.get((stop, part, sub_period), _NO_DEPARTURES)
+
+    def next_departures(  # pylint: disable=too-many-arguments
+        self,
+        stop: StopIdx | Stop,
+        after: datetime.time,
+        n: int = 1,
+        *,
+        part: StopPart | None = None,
+        sub_period: SubPeriodIdx | None = None,
+    ) -> list[Departure]:
+        """
+        Get the (up to) `n` earliest departures from a Stop at or after a
+        time; optionally only those of a StopPart (see the module docs)
+        and/or SubPeriod.
+        """
+
+        departures = self._departures(stop, part, sub_period)
+
+        start = bisect.bisect_left(departures.minutes, _minutes(after, True))
+        end = min(start + n, len(departures.minutes))
+
+        return departures.departures(start, end)
+
+    def departures_between(  # pylint: disable=too-many-arguments
+        self,
+        stop: StopIdx | Stop,
+        t0: datetime.time,
+        t1: datetime.time,
+        *,
+        part: StopPart | None = None,
+        sub_period: SubPeriodIdx | None = None,
+    ) -> list[Departure]:
+        """
+        Get the departures from a Stop within [t0, t1]; optionally only those
+        of a StopPart (see the module docs) and/or SubPeriod.
+        """
+
+        departures = self._departures(stop, part, sub_period)
+
+        start = bisect.bisect_left(departures.minutes, _minutes(t0, True))
+        end = bisect.bisect_right(departures.minutes, _minutes(t1, False))
+
+        return departures.departures(start, max(start, end))
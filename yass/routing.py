@@ -0,0 +1,337 @@
+"""
+Trip Planning over an AST (Connection Scan).
+
+Every TimeTable row is a trip; each pair of consecutive non-empty cells in a
+row is a connection from one Stop to the next. `Router` compiles the
+connections of a SubPeriod into arrays sorted by departure (and by arrival)
+and answers earliest-arrival and latest-departure queries with a single scan,
+transferring between trips at shared Stops.
+
+Times are minutes since midnight; a row whose times go backwards is assumed to
+run past midnight, and its later times are counted into the next day.
+"""
+
+from typing import NamedTuple, Sequence
+import array
+import bisect
+import datetime
+
+from yass.ast import (
+    Ast,
+    Stop,
+    StopIdx,
+    RouteIdx,
+    SubPeriodIdx,
+    TimeTableIdx,
+)
+from yass.columnar import EMPTY_CELL, MINUTES_PER_DAY, cell_to_minutes, minutes_to_cell
+
+_NEVER = 1 << 30
+
+
+class Leg(NamedTuple):
+    """
+    A ride on one trip (row) of a Route's TimeTable.
+    """
+
+    route: RouteIdx
+    time_table: TimeTableIdx
+    row: int
+
+    board: StopIdx
+    departs: datetime.time
+    alight: StopIdx
+    arrives: datetime.time
+
+
+class Journey(NamedTuple):
+    """
+    A sequence of Legs, transferring between them at shared Stops.
+    """
+
+    departs: datetime.time
+    arrives: datetime.time
+    legs: list[Leg]
+
+
+class _Trip(NamedTuple):
+    route: RouteIdx
+    time_table: TimeTableIdx
+    row: int
+
+
+class _Connections:  # pylint: disable=too-few-public-methods
+    """
+    The connections of a set of trips, as parallel arrays sorted by departure
+    time; `by_arrival` orders them by arrival time.
+    """
+
+    __slots__ = (
+        "dep_stops",
+        "arr_stops",
+        "dep_times",
+        "arr_times",
+        "trips",
+        "by_arrival",
+        "arr_times_sorted",
+    )
+
+    def __init__(self, connections: list[tuple[int, int, int, int, int]]) -> None:
+        connections.sort()
+
+        self.dep_times = array.array("i", (c[0] for c in connections))
+        self.arr_times = array.array("i", (c[1] for c in connections))
+        self.dep_stops = array.array("i", (c[2] for c in connections))
+        self.arr_stops = array.array("i", (c[3] for c in connections))
+        self.trips = array.array("i", (c[4] for c in connections))
+
+        self.by_arrival = array.array(
+            "i", sorted(range(len(connections)), key=self.arr_times.__getitem__)
+        )
+        self.arr_times_sorted = array.array(
+            "i", (self.arr_times[i] for i in self.by_arrival)
+        )
+
+
+def _time(minutes: int) -> datetime.time:
+    return minutes_to_cell(minutes % MINUTES_PER_DAY)  # type: ignore[return-value]
+
+
+def _minutes(time: datetime.time) -> int:
+    return time.hour * 60 + time.minute
+
+
+class Router:
+    """
+    Earliest-arrival and latest-departure queries over the trips of an AST,
+    scoped to a SubPeriod.
+    """
+
+    _ast: Ast
+    _stop_to_stop_idx: dict[Stop, StopIdx]
+    _trips: list[_Trip]
+    _connections: dict[SubPeriodIdx | None, _Connections]
+
+    def __init__(self, ast: Ast) -> None:
+        self._ast = ast
+        self._stop_to_stop_idx = {stop: StopIdx(i) for i, stop in enumerate(ast.stops)}
+        self._trips = []
+        self._connections = {}
+
+    def _compile(  # pylint: disable=too-many-locals
+        self, sub_period: SubPeriodIdx | None
+    ) -> _Connections:
+        if sub_period in self._connections:
+            return self._connections[sub_period]
+
+        ast = self._ast
+        route_idxs: Sequence[RouteIdx] = (
+            ast.sub_period_routes.get(sub_period, [])
+            if sub_period is not None
+            else list(ast.route_time_table.keys())
+        )
+
+        connections: list[tuple[int, int, int, int, int]] = []
+
+        for route_idx in route_idxs:
+            if route_idx not in ast.route_time_table:
+                continue
+
+            time_table_idx = ast.route_time_table[route_idx]
+            time_table = ast.time_tables[time_table_idx]
+
+            for i, row in enumerate(time_table.rows):
+                trip = len(self._trips)
+                self._trips.append(_Trip(route_idx, time_table_idx, i))
+
+                prev_stop = -1
+                prev_minutes = -1
+                day = 0
+
+                for j, cell in enumerate(row[: len(time_table.columns)]):
+                    minutes = cell_to_minutes(cell)
+                    if minutes == EMPTY_CELL:
+                        continue
+
+                    minutes += day
+                    if minutes < prev_minutes:
+                        day += MINUTES_PER_DAY
+                        minutes += MINUTES_PER_DAY
+
+                    (stop_idx, _) = time_table.columns[j]
+
+                    if prev_stop != -1:
+                        connections.append(
+                            (prev_minutes, minutes, prev_stop, stop_idx, trip)
+                        )
+
+                    prev_stop = stop_idx
+                    prev_minutes = minutes
+
+        compiled = _Connections(connections)
+        self._connections[sub_period] = compiled
+
+        return compiled
+
+    def _stop_idx(self, stop: StopIdx | Stop) -> StopIdx:
+        if isinstance(stop, str):
+            if stop not in self._stop_to_stop_idx:
+                raise KeyError(f"unknown stop: '{stop}'")
+            return self._stop_to_stop_idx[stop]
+
+        return stop
+
+    def _leg(self, enter: int, leave: int, connections: _Connections) -> Leg:
+        trip = self._trips[connections.trips[enter]]
+
+        return Leg(
+            trip.route,
+            trip.time_table,
+            trip.row,
+            StopIdx(connections.dep_stops[enter]),
+            _time(connections.dep_times[enter]),
+            StopIdx(connections.arr_stops[leave]),
+            _time(connections.arr_times[leave]),
+        )
+
+    def earliest_arrival(  # pylint: disable=too-many-arguments, too-many-locals
+        self,
+        source: StopIdx | Stop,
+        target: StopIdx | Stop,
+        depart_at: datetime.time,
+        sub_period: SubPeriodIdx | None = None,
+        min_transfer: int = 0,
+    ) -> Journey | None:
+        """
+        Find the journey that arrives at `target` the earliest, leaving
+        `source` at or after `depart_at`; transfers between trips take at
+        least `min_transfer` minutes. None if `target` can't be reached.
+        """
+
+        connections = self._compile(sub_period)
+        source = self._stop_idx(source)
+        target = self._stop_idx(target)
+
+        start = _minutes(depart_at) + (1 if depart_at.second else 0)
+
+        if source == target:
+            return Journey(_time(start), _time(start), [])
+
+        earliest = [_NEVER] * len(self._ast.stops)
+        earliest[source] = start
+
+        # trip -> connection it was boarded at
+        boarded: dict[int, int] = {}
+        # stop -> (boarded connection, alighted connection)
+        reached_by: dict[int, tuple[int, int]] = {}
+
+        dep_times = connections.dep_times
+        arr_times = connections.arr_times
+        dep_stops = connections.dep_stops
+        arr_stops = connections.arr_stops
+        trips = connections.trips
+
+        for i in range(bisect.bisect_left(dep_times, start), len(dep_times)):
+            dep_time = dep_times[i]
+            if dep_time >= earliest[target]:
+                break
+
+            trip = trips[i]
+            if trip not in boarded:
+                dep_stop = dep_stops[i]
+                transfer = 0 if dep_stop == source else min_transfer
+
+                if earliest[dep_stop] + transfer > dep_time:
+                    continue
+                boarded[trip] = i
+
+            arr_stop = arr_stops[i]
+            if arr_times[i] < earliest[arr_stop]:
+                earliest[arr_stop] = arr_times[i]
+                reached_by[arr_stop] = (boarded[trip], i)
+
+        if target not in reached_by:
+            return None
+
+        legs = []
+        stop: int = target
+        while stop != source:
+            (enter, leave) = reached_by[stop]
+            legs.append(self._leg(enter, leave, connections))
+            stop = dep_stops[enter]
+        legs.reverse()
+
+        return Journey(legs[0].departs, legs[-1].arrives, legs)
+
+    def latest_departure(  # pylint: disable=too-many-arguments, too-many-locals
+        self,
+        source: StopIdx | Stop,
+        target: StopIdx | Stop,
+        arrive_by: datetime.time,
+        sub_period: SubPeriodIdx | None = None,
+        min_transfer: int = 0,
+    ) -> Journey | None:
+        """
+        Find the journey that leaves `source` the latest while arriving at
+        `target` at or before `arrive_by`; transfers between trips take at
+        least `min_transfer` minutes. None if there is no such journey.
+        """
+
+        connections = self._compile(sub_period)
+        source = self._stop_idx(source)
+        target = self._stop_idx(target)
+
+        end = _minutes(arrive_by)
+
+        if source == target:
+            return Journey(_time(end), _time(end), [])
+
+        latest = [-_NEVER] * len(self._ast.stops)
+        latest[target] = end
+
+        # trip -> connection it was alighted at
+        alighted: dict[int, int] = {}
+        # stop -> (boarded connection, alighted connection)
+        left_by: dict[int, tuple[int, int]] = {}
+
+        dep_times = connections.dep_times
+        arr_times = connections.arr_times
+        dep_stops = connections.dep_stops
+        arr_stops = connections.arr_stops
+        trips = connections.trips
+
+        by_arrival = connections.by_arrival
+        last = bisect.bisect_right(connections.arr_times_sorted, end)
+
+        for k in range(last - 1, -1, -1):
+            i = by_arrival[k]
+
+            arr_time = arr_times[i]
+            if arr_time <= latest[source]:
+                break
+
+            trip = trips[i]
+            if trip not in alighted:
+                arr_stop = arr_stops[i]
+                transfer = 0 if arr_stop == target else min_transfer
+
+                if arr_time + transfer > latest[arr_stop]:
+                    continue
+                alighted[trip] = i
+
+            dep_stop = dep_stops[i]
+            if dep_times[i] > latest[dep_stop]:
+                latest[dep_stop] = dep_times[i]
+                left_by[dep_stop] = (i, alighted[trip])
+
+        if source not in left_by:
+            return None
+
+        legs = []
+        stop: int = source
+        while stop != target:
+            (enter, leave) = left_by[stop]
+            legs.append(self._leg(enter, leave, connections))
+            stop = arr_stops[leave]
+
+        return Journey(legs[0].departs, legs[-1].arrives, legs)
@@ -0,0 +1,174 @@
+"""
+Fetch Pages, through the ScrapeContext's cache when it has one.
+"""
+
+from typing import Any, Callable, TypeAlias
+import time
+import dataclasses
+
+import lxml.html
+
+from yass.cache import content_digest
+from yass.types import ScrapeContext
+from yass.scrape.error import ScrapeError
+
+# NOTE: bytes read from a streamed response between feeds to the parser
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# a new parser, given the page's encoding (None when undeclared)
+ParserFactory: TypeAlias = Callable[[str | None], lxml.html.HTMLParser]
+
+
+@dataclasses.dataclass(frozen=True)
+class Page:
+    """
+    A fetched page; `encoding` is None when the server didn't declare one.
+    """
+
+    url: str
+    content: bytes
+    encoding: str | None
+
+    # content address of `content`
+    digest: str
+
+
+def _read(
+    ctx: ScrapeContext,
+    url: str,
+    new_parser: ParserFactory | None,
+    use_cache: bool = True,
+) -> tuple[Page, Any | None]:
+    """
+    Fetch a page; with `new_parser`, a fetched body is streamed into a parser
+    as it downloads, which is returned too (None when the page came from the
+    cache, unparsed).
+    """
+
+    cache = ctx.cache
+    entry = cache.lookup(url) if cache is not None and use_cache else None
+
+    if cache is not None and entry is not None and cache.is_fresh(entry):
+        cached = cache.read(entry)
+
+        if cached is not None:
+            ctx.logger.info("HIT %s", url)
+            if ctx.stats is not None:
+                ctx.stats.cache_hit(url)
+
+            return (Page(url, cached, entry.encoding, entry.digest), None)
+
+        # NOTE: evicted (e.g. by another worker) since the lookup; a miss
+        entry = None
+
+    headers = (
+        cache.revalidation_headers(entry)
+        if cache is not None and entry is not None
+        else {}
+    )
+
+    ctx.logger.info("GET %s", url)
+
+    start = time.perf_counter()
+
+    parser = None
+    with ctx.session.get(
+        url, headers=headers, stream=new_parser is not None
+    ) as response:
+        if new_parser is not None and response.ok:
+            parser = new_parser(response.encoding)
+
+            chunks = []
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                parser.feed(chunk)
+                chunks.append(chunk)
+
+            content = b"".join(chunks)
+        else:
+            content = response.content
+
+    if ctx.stats is not None:
+        ctx.stats.request(
+            url,
+            time.perf_counter() - start,
+            len(content),
+            response.status_code,
+        )
+
+    if cache is not None and entry is not None and response.status_code == 304:
+        cached = cache.read(entry)
+        if cached is None:
+            # NOTE: evicted since the lookup; fetch it again, unconditionally
+            return _read(ctx, url, new_parser, use_cache=False)
+
+        entry = cache.refresh(entry)
+        return (Page(url, cached, entry.encoding, entry.digest), None)
+
+    if not response.ok:
+        raise ScrapeError(f"GET {url} failed with status {response.status_code}")
+
+    page = Page(url, content, response.encoding, content_digest(content))
+
+    if cache is not None:
+        cache.store(
+            url,
+            page.content,
+            encoding=page.encoding,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    return (page, parser)
+
+
+def fetch(ctx: ScrapeContext, url: str) -> Page:
+    """
+    Fetch a page; fresh cached pages are used as-is, and stale ones are
+    revalidated with a conditional request.
+    """
+
+    (page, _) = _read(ctx, url, None)
+    return page
+
+
+def fetch_parsed(
+    ctx: ScrapeContext, url: str, new_parser: ParserFactory
+) -> tuple[Page, Any]:
+    """
+    Fetch a page and parse it with a parser from `new_parser` (given the
+    page's encoding), returning what the parser's `close` does.
+
+    With `ctx.stream_fetch`, the body is read in chunks that are fed to the
+    parser as they arrive, so parsing overlaps the download; otherwise (and
+    for pages from the cache) the whole body is fed at once.
+    """
+
+    (page, parser) = _read(ctx, url, new_parser if ctx.stream_fetch else None)
+
+    if parser is None:
+        parser = new_parser(page.encoding)
+        parser.feed(page.content)
+
+    return (page, parser.close())
+
+
+def parse_page(page: Page) -> lxml.html.HtmlElement:
+    """
+    Parse a page into an element tree, straight from its bytes.
+    """
+
+    # NOTE: without a declared encoding, lxml picks it up from <meta charset>
+    if page.encoding is None:
+        return lxml.html.fromstring(page.content)
+
+    parser = lxml.html.HTMLParser(encoding=page.encoding)
+    return lxml.html.fromstring(page.content, parser=parser)
+
+
+def new_page_parser(encoding: str | None) -> lxml.html.HTMLParser:
+    """
+    A parser building a page's element tree; its `close` returns the root.
+    """
+
+    # NOTE: without a declared encoding, lxml picks it up from <meta charset>
+    return lxml.html.HTMLParser(encoding=encoding)
@@ -41,6 +41,7 @@ from yass.types import ScrapeContext
 from yass.const import ROOT_SCHEDULE_URL
 
 from yass.scrape.error import ScrapeError, test_single_query
+from yass.scrape.fetch import fetch, fetch_parsed, new_page_parser, parse_page
 from yass.scrape.types import (
     ScrapedPeriodParts,
     ScrapedSubPeriodIdx,
@@ -185,11 +186,33 @@ def scrape_periods(ctx: ScrapeContext) -> PeriodsScrape:
     Scrape schedules from the root page to discover existing routes.
     """
 
-    ctx.logger.info(f"GET {ROOT_SCHEDULE_URL}")
-    response = ctx.session.get(ROOT_SCHEDULE_URL)
-    assert response.ok
+    if ctx.stream_fetch:
+        (page, root) = fetch_parsed(ctx, ROOT_SCHEDULE_URL, new_page_parser)
+    else:
+        page = fetch(ctx, ROOT_SCHEDULE_URL)
+        root = None
+
+    if ctx.memo is not None:
+        memoized: PeriodsScrape | None = ctx.memo.get("periods", page.digest)
+        if memoized is not None:
+            return memoized
+
+    if root is None:
+        root = parse_page(page)
+
+    scrape = extract_periods(ctx, root)
+
+    if ctx.memo is not None:
+        ctx.memo.put("periods", page.digest, scrape)
+
+    return scrape
+
+
+def extract_periods(ctx: ScrapeContext, root: lxml.html.HtmlElement) -> PeriodsScrape:
+    """
+    Extract the Periods, SubPeriods and Routes from the root page's tree.
+    """
 
-    root: lxml.html.HtmlElement = lxml.html.fromstring(response.text)
     h3_query = root.xpath("//body/descendant::h3")
 
     assert isinstance(h3_query, list)
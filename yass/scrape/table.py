@@ -0,0 +1,390 @@
+"""
+Extract Tables from Pages.
+
+A table is read in a single pass over its own subtree, never the rest of the
+document, and its `colspan`s and `rowspan`s are expanded so that every row
+has a cell per column:
+
+```html
+<table>
+    <thead>
+        <tr><th>STOP_1 Departure</th><th>STOP_2</th></tr>
+    </thead>
+    <tbody>
+        <tr><td>7:00 AM</td><td>7:05 AM</td></tr>
+        <!-- ... -->
+    </tbody>
+</table>
+```
+
+Header rows come from the <thead> (or, without one, the leading rows of only
+<th> cells); the last header row names the columns. Rows of a <tfoot>, and
+later rows of only <th> cells (e.g. a heading within a second <tbody>), aren't
+times and are left out. Empty cells, and cells missing from short rows, are
+None. Tables nested in cells are part of the cell's text, not tables of their
+own.
+
+`TableTarget` extracts the same tables as a parser target, while the page is
+being parsed, so that it never needs to be built into a tree.
+"""
+
+from typing import Iterable, Sequence, TypeAlias
+import dataclasses
+
+import lxml.html
+
+from yass.scrape.types import (
+    ScrapedTimeTable,
+    ScrapedTimeTableCell,
+    ScrapedTimeTableColumn,
+)
+
+# NOTE: guards against absurd spans blowing up a table
+MAX_SPAN = 1000
+
+CELL_TAGS = ("td", "th")
+SECTION_TAGS = ("thead", "tbody", "tfoot")
+
+
+# text, colspan, rowspan and whether it's a <th>
+_Cell: TypeAlias = tuple[str, int, int, bool]
+
+
+def _span(value: str | None) -> int:
+    try:
+        span = int(value) if value is not None else 1
+    except ValueError:
+        span = 1
+
+    return min(max(span, 1), MAX_SPAN)
+
+
+class _RawTable:
+    """
+    The rows of a table as written, before spans are expanded; rowspans
+    don't cross sections.
+    """
+
+    head: list[list[_Cell]]
+    body: list[list[list[_Cell]]]
+
+    # whether any cell has a colspan or rowspan
+    spanned: bool
+
+    def __init__(self) -> None:
+        self.head = []
+        self.body = []
+        self.spanned = False
+
+    def add_row(self, row: list[_Cell], section: str | None) -> None:
+        """
+        Add a row of a section (thead, tbody or tfoot; None for rows directly
+        within the <table>).
+        """
+
+        if section == "thead":
+            self.head.append(row)
+            return
+
+        if section == "tfoot":
+            return
+
+        is_header = len(row) != 0 and all(header for (*_, header) in row)
+        if is_header and any(len(rows) != 0 for rows in self.body):
+            return
+
+        if section is None:
+            # NOTE: without a <thead>, leading rows of only <th> are headers
+            if is_header and len(self.body) == 0:
+                self.head.append(row)
+                return
+
+            if len(self.body) == 0:
+                self.body.append([])
+
+        self.body[-1].append(row)
+
+    def start_section(self, section: str) -> None:
+        """
+        Start a new section; a body section's rows span among themselves.
+        """
+
+        if section == "tbody":
+            self.body.append([])
+
+
+def _expand(rows: Sequence[list[_Cell]], spanned: bool) -> list[list[str | None]]:
+    if not spanned:
+        return [[text for (text, *_) in cells] for cells in rows]
+
+    grid: list[list[str | None]] = []
+
+    # column -> (rows left, text) of cells spanning down from previous rows
+    pending: dict[int, tuple[int, str]] = {}
+
+    def take_pending(row: list[str | None]) -> None:
+        col = len(row)
+        (left, text) = pending.pop(col)
+
+        row.append(text)
+        if left > 1:
+            pending[col] = (left - 1, text)
+
+    for cells in rows:
+        row: list[str | None] = []
+
+        for text, colspan, rowspan, _ in cells:
+            while len(row) in pending:
+                take_pending(row)
+
+            for _ in range(colspan):
+                if rowspan > 1:
+                    pending[len(row)] = (rowspan - 1, text)
+                row.append(text)
+
+        while len(pending) != 0 and len(row) <= max(pending):
+            if len(row) in pending:
+                take_pending(row)
+            else:
+                row.append(None)
+
+        grid.append(row)
+
+    return grid
+
+
+def _to_time_table(raw: _RawTable, digest: str | None) -> ScrapedTimeTable:
+    head = _expand(raw.head, raw.spanned)
+
+    columns: list[ScrapedTimeTableColumn] = (
+        [name or "" for name in head[-1]] if len(head) != 0 else []
+    )
+    n_columns = len(columns)
+
+    values: list[list[ScrapedTimeTableCell]] = []
+
+    for section in raw.body:
+        for row in _expand(section, raw.spanned):
+            cells = [text or None for text in row[:n_columns]]
+            cells.extend([None] * (n_columns - len(cells)))
+
+            values.append(cells)
+
+    return ScrapedTimeTable(columns, values, digest)
+
+
+def _read_row(raw: _RawTable, tr_el: lxml.html.HtmlElement) -> list[_Cell]:
+    row = []
+
+    for el in tr_el:
+        tag = el.tag
+        if tag not in CELL_TAGS:
+            continue
+
+        # NOTE: text_content is (much) slower; most cells are only text
+        text = el.text_content() if len(el) != 0 else el.text
+        colspan = el.get("colspan")
+        rowspan = el.get("rowspan")
+
+        if colspan is None and rowspan is None:
+            row.append((text.strip() if text is not None else "", 1, 1, tag == "th"))
+            continue
+
+        raw.spanned = True
+        row.append(
+            (
+                text.strip() if text is not None else "",
+                _span(colspan),
+                _span(rowspan),
+                tag == "th",
+            )
+        )
+
+    return row
+
+
+def extract_table(
+    table_el: lxml.html.HtmlElement, digest: str | None = None
+) -> ScrapedTimeTable:
+    """
+    Extract a <table> element's columns and rows, walking only its subtree.
+    """
+
+    raw = _RawTable()
+
+    for child_el in table_el:
+        if child_el.tag in SECTION_TAGS:
+            raw.start_section(child_el.tag)
+
+            for tr_el in child_el:
+                if tr_el.tag == "tr":
+                    raw.add_row(_read_row(raw, tr_el), child_el.tag)
+        elif child_el.tag == "tr":
+            raw.add_row(_read_row(raw, child_el), None)
+
+    return _to_time_table(raw, digest)
+
+
+def extract_tables(
+    root: lxml.html.HtmlElement, digest: str | None = None
+) -> list[ScrapedTimeTable]:
+    """
+    Extract every (outermost) table within an element, in document order.
+    """
+
+    tables: list[ScrapedTimeTable] = []
+    stack = [root]
+
+    while len(stack) != 0:
+        el = stack.pop()
+
+        if el.tag == "table":
+            tables.append(extract_table(el, digest))
+            continue
+
+        stack.extend(reversed([child for child in el if isinstance(child.tag, str)]))
+
+    return tables
+
+
+class TableTarget:
+    """
+    A parser target that extracts every (outermost) table of a page as it is
+    parsed; `close` returns them, in document order.
+    """
+
+    _tables: list[_RawTable]
+
+    # how many <table>s deep the parser is
+    _depth: int
+
+    _section: str | None
+    _row: list[_Cell] | None
+
+    _cell_text: list[str] | None
+    _cell_attrib: dict[str, str]
+    _cell_tag: str
+
+    def __init__(self) -> None:
+        self._tables = []
+        self._depth = 0
+
+        self._section = None
+        self._row = None
+
+        self._cell_text = None
+        self._cell_attrib = {}
+        self._cell_tag = ""
+
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        """
+        Handle an opening tag.
+        """
+
+        if tag == "table":
+            self._depth += 1
+            if self._depth == 1:
+                self._tables.append(_RawTable())
+                self._section = None
+            return
+
+        if self._depth != 1:
+            return
+
+        if tag in SECTION_TAGS:
+            self._section = tag
+            self._tables[-1].start_section(tag)
+        elif tag == "tr":
+            self._row = []
+        elif tag in CELL_TAGS and self._row is not None:
+            self._cell_text = []
+            self._cell_attrib = dict(attrib)
+            self._cell_tag = tag
+
+    def end(self, tag: str) -> None:
+        """
+        Handle a closing tag.
+        """
+
+        if tag == "table":
+            self._depth -= 1
+            return
+
+        if self._depth != 1:
+            return
+
+        if tag in CELL_TAGS and self._row is not None and self._cell_text is not None:
+            colspan = self._cell_attrib.get("colspan")
+            rowspan = self._cell_attrib.get("rowspan")
+
+            if colspan is not None or rowspan is not None:
+                self._tables[-1].spanned = True
+
+            self._row.append(
+                (
+                    "".join(self._cell_text).strip(),
+                    _span(colspan),
+                    _span(rowspan),
+                    self._cell_tag == "th",
+                )
+            )
+            self._cell_text = None
+        elif tag == "tr" and self._row is not None:
+            self._tables[-1].add_row(self._row, self._section)
+            self._row = None
+        elif tag in SECTION_TAGS:
+            self._section = None
+
+    def data(self, data: str) -> None:
+        """
+        Handle text.
+        """
+
+        if self._cell_text is not None:
+            self._cell_text.append(data)
+
+    def close(self) -> list[ScrapedTimeTable]:
+        """
+        The tables of the page (without a digest; see `with_digest`).
+        """
+
+        return [_to_time_table(raw, None) for raw in self._tables]
+
+
+def new_table_parser(encoding: str | None = None) -> lxml.html.HTMLParser:
+    """
+    A parser extracting tables with a TableTarget; its `close` returns them.
+    """
+
+    # NOTE: the stubs don't know about targets returning from close
+    return lxml.html.HTMLParser(
+        target=TableTarget(), encoding=encoding  # type: ignore[arg-type]
+    )
+
+
+def with_digest(
+    tables: list[ScrapedTimeTable], digest: str | None
+) -> list[ScrapedTimeTable]:
+    """
+    The tables, marked as scraped from the page with content address `digest`.
+    """
+
+    return [dataclasses.replace(table, digest=digest) for table in tables]
+
+
+def parse_tables(
+    chunks: Iterable[bytes], encoding: str | None = None, digest: str | None = None
+) -> list[ScrapedTimeTable]:
+    """
+    Extract every (outermost) table of a page fed in chunks, without building
+    a tree.
+    """
+
+    parser = new_table_parser(encoding)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+
+    tables: list[ScrapedTimeTable] = parser.close()  # type: ignore[assignment]
+
+    return with_digest(tables, digest)
@@ -2,28 +2,84 @@
 Scrape Timetable information from Routes.
 """
 
-from typing import cast
+from typing import Any, Iterator, Sequence
+import collections
 import urllib.parse
+import concurrent.futures
 
 import lxml.html
 
 from yass.types import ScrapeContext
 from yass.const import ROOT_SCHEDULE_URL
 
+from yass.scrape.error import ScrapeError
+from yass.scrape.fetch import (
+    Page,
+    fetch,
+    fetch_parsed,
+    new_page_parser,
+    parse_page,
+)
+from yass.scrape.table import (
+    extract_table,
+    new_table_parser,
+    parse_tables,
+    with_digest,
+)
 from yass.scrape.types import (
     ScrapedRoute,
     ScrapedRouteIdx,
     ScrapedTimeTable,
     ScrapedTimeTables,
-    ScrapedTimeTableCell,
-    ScrapedTimeTableColumn,
 )
 from yass.scrape.periods import PeriodsScrape
 
+# NOTE: bounds how many scraped TimeTables wait on a slow consumer, per worker
+PIPELINE_AHEAD = 2
+
+
+def _count_cells(
+    ctx: ScrapeContext, route: ScrapedRoute, time_table: ScrapedTimeTable
+) -> None:
+    if ctx.stats is None:
+        return
+
+    n_cells = sum(
+        sum(1 for value in row if value is not None) for row in time_table.values
+    )
+    ctx.stats.route_cells(route.href, n_cells)
 
-def scrape_time_table(  # pylint: disable=too-many-locals
-    ctx: ScrapeContext, route: ScrapedRoute
+
+def extract_time_table(
+    page: Page, parsed: Any, stream_tables: bool = False
 ) -> ScrapedTimeTable:
+    """
+    Extract the TimeTable of a route page; `parsed` is what the page was
+    already parsed into (its tree, or its tables with `stream_tables`), if
+    anything.
+    """
+
+    if stream_tables:
+        tables = (
+            with_digest(parsed, page.digest)
+            if parsed is not None
+            else parse_tables((page.content,), page.encoding, page.digest)
+        )
+    else:
+        tree: lxml.html.HtmlElement = parsed if parsed is not None else parse_page(page)
+        query = tree.xpath("//body/descendant::table[1]")
+
+        assert isinstance(query, list)
+        tables = [extract_table(table, page.digest) for table in query]
+
+    if len(tables) == 0:
+        raise ScrapeError(f"no table in route page {page.url}")
+
+    # NOTE: a route's TimeTable is the first table on its page
+    return tables[0]
+
+
+def scrape_time_table(ctx: ScrapeContext, route: ScrapedRoute) -> ScrapedTimeTable:
     """
     Scrape Timetables from a route-specific page.
     """
@@ -35,51 +91,126 @@ def scrape_time_table(  # pylint: disable=too-many-locals
 
     href = urllib.parse.urlunparse(raw)
 
-    ctx.logger.info(f"GET {href}")
-    response = ctx.session.get(href)
+    # NOTE: a streamed page is parsed while it downloads, before the memo
+    # can be consulted; the memo then only saves extracting its tables
+    if ctx.stream_fetch:
+        new_parser = new_table_parser if ctx.stream_tables else new_page_parser
+        (page, parsed) = fetch_parsed(ctx, href, new_parser)
+    else:
+        page = fetch(ctx, href)
+        parsed = None
 
-    assert response.ok
+    if ctx.memo is not None:
+        memoized: ScrapedTimeTable | None = ctx.memo.get("time_table", page.digest)
+        if memoized is not None:
+            _count_cells(ctx, route, memoized)
+            return memoized
 
-    tree: lxml.html.HtmlElement = lxml.html.fromstring(response.text)
-    query = tree.xpath("//body/descendant::table[1]")
+    time_table = extract_time_table(page, parsed, ctx.stream_tables)
 
-    assert isinstance(query, list)
-    (table, *_) = cast(list[lxml.html.Element], query)
+    if ctx.memo is not None:
+        ctx.memo.put("time_table", page.digest, time_table)
 
-    th_els = table.xpath("//thead[1]//th")
-    stops: set[str] = set()
+    _count_cells(ctx, route, time_table)
 
-    columns: list[ScrapedTimeTableColumn] = []
-    values: list[list[ScrapedTimeTableCell]] = []
+    return time_table
 
-    for th_el in th_els:
-        name = th_el.text.strip()
 
-        stops.add(name)
-        columns.append(name)
+def _scrape_time_tables_concurrently(
+    ctx: ScrapeContext, routes: Sequence[ScrapedRoute]
+) -> list[ScrapedTimeTable]:
+    """
+    Scrape the TimeTables for Routes using a bounded pool of worker threads;
+    results keep the order of `routes`.
+    """
 
-    row_els = table.xpath("//tbody[1]//tr")
-    for i, row_el in enumerate(row_els):
-        col_els = list(row_el.iterchildren())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=ctx.workers) as executor:
+        futures = [executor.submit(scrape_time_table, ctx, route) for route in routes]
 
-        # pre-fill a list with None values of an appropriate size
-        values.append([None] * len(columns))
+        try:
+            # NOTE: errors are re-raised per route, in scrape order
+            return [future.result() for future in futures]
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
 
-        for j in range(len(columns)):
-            if j >= len(col_els):
-                continue
 
-            value = col_els[j].text.strip()
-            values[i][j] = value
+def iter_time_tables(
+    ctx: ScrapeContext, routes: Sequence[ScrapedRoute]
+) -> Iterator[ScrapedTimeTable]:
+    """
+    Scrape the TimeTable of each Route in background threads, yielding them in
+    the order of `routes` as soon as each (and every one before it) is ready; a
+    page shared by several Routes is scraped once.
 
-    return ScrapedTimeTable(columns, values)
+    Up to `ctx.workers` pages are scraped at once, and no more than
+    `PIPELINE_AHEAD` times as many are scraped ahead of the consumer.
+    """
+
+    # href -> Routes still to be yielded that need it
+    remaining = collections.Counter(route.href for route in routes)
+
+    href_to_route: dict[str, ScrapedRoute] = {}
+    for route in routes:
+        href_to_route.setdefault(route.href, route)
+
+    to_submit = iter(href_to_route.values())
+    max_ahead = PIPELINE_AHEAD * ctx.workers
+
+    futures: dict[str, concurrent.futures.Future[ScrapedTimeTable]] = {}
+    yielded: set[str] = set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=ctx.workers) as executor:
+        try:
+            for route in routes:
+                # NOTE: hrefs are submitted in the order they're first needed
+                while len(futures) - len(yielded) < max_ahead:
+                    next_route = next(to_submit, None)
+                    if next_route is None:
+                        break
+
+                    futures[next_route.href] = executor.submit(
+                        scrape_time_table, ctx, next_route
+                    )
+
+                time_table = futures[route.href].result()
+
+                yielded.add(route.href)
+                remaining[route.href] -= 1
+
+                if remaining[route.href] == 0:
+                    del futures[route.href]
+                    yielded.discard(route.href)
+
+                yield time_table
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
 
 
 def scrape_time_tables(ctx: ScrapeContext, scrape: PeriodsScrape) -> ScrapedTimeTables:
     """
-    Scrape the TimeTables for each Route within a ScrapedGroupParts.
+    Scrape the TimeTables for each Route within a ScrapedGroupParts; a page
+    shared by several Routes (the same href) is only scraped once.
     """
 
+    href_to_route: dict[str, ScrapedRoute] = {}
+
+    for part in scrape.period_parts:
+        for route in part.routes:
+            href_to_route.setdefault(route.href, route)
+
+    routes = list(href_to_route.values())
+
+    if ctx.workers > 1:
+        time_tables = _scrape_time_tables_concurrently(ctx, routes)
+    else:
+        time_tables = [scrape_time_table(ctx, route) for route in routes]
+
+    href_to_time_table = {
+        route.href: time_table for route, time_table in zip(routes, time_tables)
+    }
+
     part_timetables = []
 
     for part in scrape.period_parts:
@@ -87,9 +218,7 @@ def scrape_time_tables(ctx: ScrapeContext, scrape: PeriodsScrape) -> ScrapedTime
 
         for i, route in enumerate(part.routes):
             idx = ScrapedRouteIdx(i)
-
-            time_table = scrape_time_table(ctx, route)
-            route_idx_to_time_table[idx] = time_table
+            route_idx_to_time_table[idx] = href_to_time_table[route.href]
 
         part_timetables.append(route_idx_to_time_table)
 
@@ -67,5 +67,8 @@ class ScrapedTimeTable:
     columns: Sequence[ScrapedTimeTableColumn]
     values: Sequence[Sequence[ScrapedTimeTableCell]]
 
+    # content address of the page scraped from, if known
+    digest: str | None = None
+
 
 ScrapedTimeTables: TypeAlias = Sequence[dict[ScrapedRouteIdx, ScrapedTimeTable]]
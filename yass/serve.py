@@ -0,0 +1,378 @@
+"""
+Serve an AST over HTTP.
+
+```text
+GET /ast              the whole AST (as `yass scrape` outputs it)
+GET /routes/<idx>     a Route, with its Period, SubPeriod, Stops and TimeTable
+GET /stops/<idx>      a Stop, with the times of every Route that serves it
+```
+
+Every body is encoded once per AST (and, for slices, once per first request)
+along with its gzip and deflate variants; responses carry a strong `ETag` per
+variant and conditional requests are answered with `304 Not Modified`.
+"""
+
+from typing import Any, Callable
+import io
+import os
+import re
+import gzip
+import json
+import zlib
+import datetime
+import hashlib
+import logging
+import threading
+import http.server
+
+import serde
+
+from yass.ast import Ast, RouteIdx, StopIdx, TimeTableRow
+from yass.encode import write_json
+
+CODINGS = ("gzip", "deflate")
+
+_ROUTE_PATH_RE = re.compile(r"^/routes/([0-9]+)$")
+_STOP_PATH_RE = re.compile(r"^/stops/([0-9]+)$")
+
+
+class Body:  # pylint: disable=too-few-public-methods
+    """
+    A response body, encoded up front in every supported content coding.
+    """
+
+    __slots__ = ("variants", "digest")
+
+    variants: dict[str, bytes]
+    digest: str
+
+    def __init__(self, data: bytes) -> None:
+        self.digest = hashlib.sha256(data).hexdigest()[:32]
+        self.variants = {
+            "identity": data,
+            "gzip": gzip.compress(data, mtime=0),
+            "deflate": zlib.compress(data),
+        }
+
+    def etag(self, coding: str) -> str:
+        """
+        A strong ETag for the variant in `coding`.
+        """
+
+        if coding == "identity":
+            return f'"{self.digest}"'
+
+        return f'"{self.digest}-{coding}"'
+
+
+def _json_body(value: Any) -> Body:
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return Body(data.encode("utf-8"))
+
+
+def _cell(row: TimeTableRow, j: int) -> str:
+    if j >= len(row):
+        return ""
+
+    cell = row[j]
+    return cell.isoformat() if isinstance(cell, datetime.time) else ""
+
+
+def _dict(value: Any) -> Any:
+    return serde.to_dict(value, reuse_instances=False)
+
+
+class Snapshot:
+    """
+    The bodies served for one AST; slices are encoded when first requested.
+    """
+
+    ast: Ast
+    document: Body
+
+    _slices: dict[str, Body]
+
+    def __init__(self, ast: Ast) -> None:
+        self.ast = ast
+
+        buf = io.StringIO()
+        write_json(ast, buf)
+        self.document = Body(buf.getvalue().encode("utf-8"))
+
+        self._slices = {}
+
+    def _slice(self, key: str, encode: Callable[[], Any]) -> Body:
+        # NOTE: racing threads may both encode a slice; either result is fine
+        body = self._slices.get(key)
+
+        if body is None:
+            body = _json_body(encode())
+            self._slices[key] = body
+
+        return body
+
+    def route(self, route_idx: RouteIdx) -> Body | None:
+        """
+        A Route and everything needed to read its TimeTable.
+        """
+
+        ast = self.ast
+        if not 0 <= route_idx < len(ast.routes):
+            return None
+
+        def encode() -> Any:
+            sub_period_idx = ast.route_sub_period.get(route_idx)
+            period_idx = ast.route_period.get(route_idx)
+            time_table_idx = ast.route_time_table.get(route_idx)
+
+            return {
+                "route": _dict(ast.routes[route_idx]),
+                "period": (
+                    _dict(ast.periods[period_idx]) if period_idx is not None else None
+                ),
+                "sub_period": (
+                    _dict(ast.sub_periods[sub_period_idx])
+                    if sub_period_idx is not None
+                    else None
+                ),
+                "stops": {
+                    str(stop_idx): ast.stops[stop_idx]
+                    for stop_idx in ast.route_stops.get(route_idx, [])
+                },
+                "time_table": (
+                    _dict(ast.time_tables[time_table_idx])
+                    if time_table_idx is not None
+                    else None
+                ),
+            }
+
+        return self._slice(f"routes/{route_idx}", encode)
+
+    def stop(self, stop_idx: StopIdx) -> Body | None:
+        """
+        A Stop and, per Route serving it, the times of its columns.
+        """
+
+        ast = self.ast
+        if not 0 <= stop_idx < len(ast.stops):
+            return None
+
+        def encode() -> Any:
+            routes = []
+
+            for route_idx in ast.stop_routes.get(stop_idx, []):
+                time_table = ast.time_tables[ast.route_time_table[route_idx]]
+
+                columns = [
+                    {
+                        "part": part.value,
+                        "times": [_cell(row, j) for row in time_table.rows],
+                    }
+                    for j, (column_stop_idx, part) in enumerate(time_table.columns)
+                    if column_stop_idx == stop_idx
+                ]
+
+                routes.append(
+                    {
+                        "route": route_idx,
+                        "sub_period": ast.route_sub_period.get(route_idx),
+                        "period": ast.route_period.get(route_idx),
+                        "columns": columns,
+                    }
+                )
+
+            return {"stop": ast.stops[stop_idx], "routes": routes}
+
+        return self._slice(f"stops/{stop_idx}", encode)
+
+    def lookup(self, path: str) -> Body | None:
+        """
+        The body served at `path`, if any.
+        """
+
+        if path == "/ast":
+            return self.document
+
+        match = _ROUTE_PATH_RE.match(path)
+        if match is not None:
+            return self.route(RouteIdx(int(match[1])))
+
+        match = _STOP_PATH_RE.match(path)
+        if match is not None:
+            return self.stop(StopIdx(int(match[1])))
+
+        return None
+
+
+def choose_coding(accept_encoding: str | None) -> str:
+    """
+    Pick the content coding to respond with, given an Accept-Encoding header.
+    """
+
+    if accept_encoding is None:
+        return "identity"
+
+    accepted: dict[str, float] = {}
+
+    for item in accept_encoding.split(","):
+        (coding, *params) = item.strip().lower().split(";")
+        quality = 1.0
+
+        for param in params:
+            (name, _, value) = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        accepted[coding.strip()] = quality
+
+    for coding in CODINGS:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+
+    return "identity"
+
+
+class AstServer(http.server.ThreadingHTTPServer):
+    """
+    An HTTP server for the latest AST; `update` swaps in a new one.
+
+    With `path`, the AST is (re)loaded from that file whenever it changes;
+    until it first loads, requests are answered with 503.
+    """
+
+    daemon_threads = True
+
+    logger: logging.Logger
+
+    _snapshot: Snapshot | None
+    _load: Callable[[str], Ast] | None
+    _path: str | None
+    _mtime: float | None
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        logger: logging.Logger,
+        path: str | None = None,
+        load: Callable[[str], Ast] | None = None,
+    ) -> None:
+        super().__init__(address, AstRequestHandler)
+
+        self.logger = logger
+        self._snapshot = None
+        self._load = load
+        self._path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def update(self, ast: Ast) -> None:
+        """
+        Serve a new AST.
+        """
+
+        self._snapshot = Snapshot(ast)
+
+    @property
+    def snapshot(self) -> Snapshot | None:
+        """
+        The bodies of the current AST, if there is one yet.
+        """
+
+        if self._path is not None and self._load is not None:
+            with self._lock:
+                self._reload(self._path, self._load)
+
+        return self._snapshot
+
+    def _reload(self, path: str, load: Callable[[str], Ast]) -> None:
+        # NOTE: a file that's missing or unloadable (e.g. mid-replacement)
+        # leaves the last good snapshot served; it's retried next request
+        try:
+            mtime = os.stat(path).st_mtime
+
+            if mtime != self._mtime:
+                self.update(load(path))
+                self._mtime = mtime
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.logger.exception("failed to load %s", path)
+
+
+class AstRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers GET and HEAD requests from an AstServer's snapshot.
+    """
+
+    server: AstServer
+
+    def _error(self, status: int, message: str, head: bool) -> None:
+        data = json.dumps({"error": message}).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+
+        if not head:
+            self.wfile.write(data)
+
+    def _respond(self, head: bool) -> None:
+        path = self.path.split("?", 1)[0]
+
+        snapshot = self.server.snapshot
+        if snapshot is None:
+            self._error(503, "no ast yet", head)
+            return
+
+        body = snapshot.lookup(path)
+        if body is None:
+            self._error(404, f"not found: {path}", head)
+            return
+
+        coding = choose_coding(self.headers.get("Accept-Encoding"))
+        etag = body.etag(coding)
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None and (
+            if_none_match.strip() == "*"
+            or etag in (tag.strip() for tag in if_none_match.split(","))
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        data = body.variants[coding]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if coding != "identity":
+            self.send_header("Content-Encoding", coding)
+        self.end_headers()
+
+        if not head:
+            self.wfile.write(data)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Serve a body.
+        """
+
+        self._respond(head=False)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        """
+        Serve the headers of a body.
+        """
+
+        self._respond(head=True)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=W0622
+        self.server.logger.info(format, *args)
@@ -0,0 +1,130 @@
+"""
+Timings and Counters of a Scrape.
+
+A `Stats` on the ScrapeContext is told about every request and every route
+scraped; subclass it to forward these elsewhere. Without one, nothing is
+measured.
+"""
+
+from typing import Any, ContextManager, Iterator
+import time
+import threading
+import contextlib
+
+
+class Stats:
+    """
+    Collects per-request latencies and sizes, per-stage durations, and
+    per-route cell counts; safe to share between worker threads.
+    """
+
+    _lock: threading.Lock
+
+    # NOTE: one per request; a URL fetched again (e.g. revalidated) has several
+    _requests: list[dict[str, Any]]
+    _cache_hits: int
+    _stages: dict[str, float]
+    _route_cells: dict[str, int]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+        self._requests = []
+        self._cache_hits = 0
+        self._stages = {}
+        self._route_cells = {}
+
+    def request(self, url: str, seconds: float, n_bytes: int, status: int) -> None:
+        """
+        Record a request made for `url`, that took `seconds` and downloaded
+        `n_bytes` of content.
+        """
+
+        with self._lock:
+            self._requests.append(
+                {
+                    "url": url,
+                    "seconds": seconds,
+                    "bytes": n_bytes,
+                    "status": status,
+                }
+            )
+
+    def cache_hit(self, url: str) -> None:  # pylint: disable=unused-argument
+        """
+        Record that `url` was served from the cache, without a request.
+        """
+
+        with self._lock:
+            self._cache_hits += 1
+
+    def route_cells(self, href: str, n_cells: int) -> None:
+        """
+        Record the number of (non-empty) TimeTable cells scraped for a route.
+        """
+
+        with self._lock:
+            self._route_cells[href] = n_cells
+
+    def stage_done(self, name: str, seconds: float) -> None:
+        """
+        Record that a stage of the scrape took `seconds`.
+        """
+
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time the body of a with statement as a stage.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_done(name, time.perf_counter() - start)
+
+    def summary(self) -> dict[str, Any]:
+        """
+        A JSON-compatible summary of everything recorded.
+        """
+
+        with self._lock:
+            latencies = [entry["seconds"] for entry in self._requests]
+
+            # NOTE: per URL, the totals of its requests and the last status
+            urls: dict[str, dict[str, Any]] = {}
+            for entry in self._requests:
+                url = urls.setdefault(
+                    entry["url"], {"count": 0, "bytes": 0, "seconds": 0.0}
+                )
+                url["count"] += 1
+                url["bytes"] += entry["bytes"]
+                url["seconds"] += entry["seconds"]
+                url["status"] = entry["status"]
+
+            return {
+                "requests": {
+                    "count": len(self._requests),
+                    "cache_hits": self._cache_hits,
+                    "bytes": sum(entry["bytes"] for entry in self._requests),
+                    "seconds": sum(latencies),
+                    "max_seconds": max(latencies, default=0.0),
+                    "urls": urls,
+                },
+                "stages": dict(self._stages),
+                "route_cells": dict(self._route_cells),
+            }
+
+
+def stage(stats: Stats | None, name: str) -> ContextManager[None]:
+    """
+    Time a stage if there are Stats to record it into.
+    """
+
+    if stats is None:
+        return contextlib.nullcontext()
+
+    return stats.stage(name)
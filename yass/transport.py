@@ -0,0 +1,184 @@
+"""
+Record and Replay HTTP Responses.
+
+`RecordingAdapter` saves every response it sends through to a directory, and
+`ReplayAdapter` answers requests from such a directory without any network:
+
+```text
+FIXTURE_DIR/
+    <sha256 of "METHOD url">.json  (url, status, reason and headers)
+    <sha256 of "METHOD url">.body
+```
+
+Both are `requests` transport adapters, mounted on the ScrapeContext's
+session.
+"""
+
+from typing import Any, Callable, Iterator, Mapping
+import io
+import os
+import json
+import hashlib
+
+import requests
+import requests.adapters
+import requests.utils
+from requests.structures import CaseInsensitiveDict
+
+from yass.fs import write_atomic
+
+
+def _fixture_key(method: str, url: str) -> str:
+    return hashlib.sha256(f"{method} {url}".encode()).hexdigest()
+
+
+def build_response(
+    request: requests.PreparedRequest,
+    status: int,
+    headers: Mapping[str, str],
+    body: bytes,
+    reason: str | None = None,
+) -> requests.Response:
+    """
+    Build a Response to a request from its parts, as an adapter would.
+    """
+
+    response = requests.Response()
+
+    response.request = request
+    response.url = request.url or ""
+    response.status_code = status
+    response.reason = reason or ""
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.raw = io.BytesIO(body)
+
+    return response
+
+
+class _RecordingStream:
+    """
+    A response's raw stream that passes its (decoded) body through as it's
+    read, and hands the whole body to `done` once it's been read to the end.
+    """
+
+    def __init__(self, raw: Any, done: Callable[[bytes], None]) -> None:
+        self._raw = raw
+        self._done = done
+
+    def stream(
+        self, amt: int | None = None, decode_content: bool | None = None
+    ) -> Iterator[bytes]:
+        """
+        Stream the body, as `urllib3.HTTPResponse.stream` does.
+        """
+
+        chunks = []
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            chunks.append(chunk)
+            yield chunk
+
+        self._done(b"".join(chunks))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """
+    An HTTPAdapter that also records every response into a directory; a
+    streamed response is recorded once its body has been read to the end.
+    """
+
+    path: str
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def send(  # type: ignore[override] # pylint: disable=arguments-differ
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        response = super().send(request, **kwargs)
+
+        def record(body: bytes) -> None:
+            self._record(request, response, body)
+
+        if kwargs.get("stream", False):
+            # NOTE: recorded as it's read, so the body can still be streamed
+            response.raw = _RecordingStream(response.raw, record)
+        else:
+            # NOTE: reading the body here leaves it cached on the response
+            record(response.content)
+
+        return response
+
+    def _record(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        body: bytes,
+    ) -> None:
+        # NOTE: the body is stored decoded; it mustn't be decoded again
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length")
+        }
+
+        key = _fixture_key(request.method or "GET", request.url or "")
+        meta = {
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": headers,
+        }
+
+        # NOTE: the body is written first, so a fixture is never half-recorded
+        write_atomic(os.path.join(self.path, f"{key}.body"), body)
+        write_atomic(
+            os.path.join(self.path, f"{key}.json"),
+            json.dumps(meta, indent=4).encode("utf-8"),
+        )
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """
+    A transport adapter that answers requests with responses recorded by
+    RecordingAdapter; requests that weren't recorded fail.
+    """
+
+    path: str
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"no recorded responses in '{path}'")
+
+        self.path = path
+
+    def send(  # type: ignore[override] # pylint: disable=arguments-differ
+        self, request: requests.PreparedRequest, **_: Any
+    ) -> requests.Response:
+        key = _fixture_key(request.method or "GET", request.url or "")
+
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), "rb") as meta_file:
+                meta = json.load(meta_file)
+            with open(os.path.join(self.path, f"{key}.body"), "rb") as body_file:
+                body = body_file.read()
+        except FileNotFoundError:
+            raise requests.ConnectionError(
+                f"no recorded response for {request.method} {request.url}",
+                request=request,
+            ) from None
+
+        return build_response(
+            request, meta["status"], meta["headers"], body, meta["reason"]
+        )
+
+    def close(self) -> None:
+        pass
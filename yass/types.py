@@ -7,12 +7,34 @@ import dataclasses
 
 import requests
 
+from yass.cache import HttpCache
+from yass.memo import MemoStore
+from yass.stats import Stats
+
 
 @dataclasses.dataclass
-class ScrapeContext:
+class ScrapeContext:  # pylint: disable=too-many-instance-attributes
     """
     Scraping Context.
     """
 
     logger: logging.Logger
     session: requests.Session
+
+    # maximum number of route pages fetched concurrently
+    workers: int = 1
+
+    # an optional persistent cache of fetched pages
+    cache: HttpCache | None = None
+
+    # an optional store of results scraped from unchanged pages
+    memo: MemoStore | None = None
+
+    # parse pages in chunks as they download, rather than once fetched
+    stream_fetch: bool = False
+
+    # extract route page tables while parsing, without building a tree
+    stream_tables: bool = False
+
+    # optional timings and counters of the scrape
+    stats: Stats | None = None
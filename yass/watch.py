@@ -0,0 +1,141 @@
+"""
+Re-scrape on an Interval.
+
+A `Watcher` keeps one ScrapeContext (and so one warm `requests.Session`, with
+its pooled keep-alive connections) across polls, and only reports an AST when
+it differs from the last one.
+"""
+
+from typing import Callable
+import random
+import threading
+
+import requests
+
+from yass.ast import Ast
+from yass.diff import ast_digest
+from yass.types import ScrapeContext
+from yass.pipeline import scrape_ast
+from yass.scrape.error import ScrapeError
+
+MAX_BACKOFF_EXPONENT = 16
+
+
+class Watcher:  # pylint: disable=too-many-instance-attributes
+    """
+    Polls the schedule every `interval` seconds (give or take `jitter`, a
+    fraction of the interval); failed polls, whatever the error, are logged
+    and retried after exponentially longer delays, up to `max_backoff`
+    seconds.
+
+    `on_change` is called with every new AST, from the watching thread;
+    starting from `ast` (e.g. the one last written), an unchanged schedule
+    isn't reported as new.
+    """
+
+    ctx: ScrapeContext
+    interval: float
+    jitter: float
+    max_backoff: float
+    on_change: Callable[[Ast], None] | None
+
+    _ast: Ast | None
+    _digest: str | None
+    _failures: int
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        ctx: ScrapeContext,
+        interval: float,
+        *,
+        jitter: float = 0.1,
+        max_backoff: float = 3600.0,
+        on_change: Callable[[Ast], None] | None = None,
+        ast: Ast | None = None,
+    ) -> None:
+        self.ctx = ctx
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.on_change = on_change
+
+        self._ast = ast
+        self._digest = ast_digest(ast) if ast is not None else None
+        self._failures = 0
+
+    @property
+    def ast(self) -> Ast | None:
+        """
+        The last AST scraped successfully, if any.
+        """
+
+        return self._ast
+
+    @property
+    def digest(self) -> str | None:
+        """
+        The digest (see `yass.diff.ast_digest`) of the last good AST.
+        """
+
+        return self._digest
+
+    def poll(self) -> bool:
+        """
+        Scrape once; True if the AST changed.
+        """
+
+        ast = scrape_ast(self.ctx)
+        digest = ast_digest(ast)
+
+        if digest == self._digest:
+            return False
+
+        self._ast = ast
+        self._digest = digest
+
+        if self.on_change is not None:
+            self.on_change(ast)
+
+        return True
+
+    def next_delay(self) -> float:
+        """
+        Seconds to wait before the next poll.
+        """
+
+        delay = self.interval
+
+        if self._failures != 0:
+            # NOTE: long streaks of failures mustn't grow the exponent unbounded
+            exponent = min(self._failures, MAX_BACKOFF_EXPONENT)
+            delay = min(self.interval * 2**exponent, self.max_backoff)
+
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """
+        Poll until `stop` is set (or forever); errors while scraping are
+        logged and retried.
+        """
+
+        if stop is None:
+            stop = threading.Event()
+
+        while not stop.is_set():
+            try:
+                if self.poll():
+                    self.ctx.logger.info("ast changed (%s)", self._digest)
+                else:
+                    self.ctx.logger.info("ast unchanged")
+
+                self._failures = 0
+            except (ScrapeError, requests.RequestException) as error:
+                self._failures += 1
+                self.ctx.logger.warning("poll failed (%d): %s", self._failures, error)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # NOTE: e.g. a page that no longer parses; keep the last AST
+                # and keep watching rather than dying silently in a thread
+                self._failures += 1
+                self.ctx.logger.exception("poll failed (%d)", self._failures)
+
+            stop.wait(self.next_delay())